@@ -0,0 +1,164 @@
+'''
+Stateful book of European options that refreshes prices and Greeks incrementally on market ticks.
+'''
+
+from collections import namedtuple
+
+import numpy as np
+from scipy.special import ndtr
+
+from BSKernels import HAS_NUMBA, norm_cdf
+
+# norm_cdf is only a true ufunc (accepting out=) when it is compiled; scipy.special.ndtr is the same function
+_cdf = norm_cdf if HAS_NUMBA else ndtr
+_INV_SQRT_2PI = 1 / np.sqrt(2 * np.pi)
+
+BookGreeks = namedtuple('BookGreeks', ['price', 'delta', 'gamma', 'theta', 'vega', 'rho', 'vanna', 'volga'])
+
+
+class BSBook:
+    '''
+    This class keeps the Black-Scholes price and Greeks of a book of European calls/puts up to date as the
+    spots (and volatilities) of their underlyings move.
+
+    S0: the current spot of each contract's underlying (contracts on the same underlying must agree)
+    K: the strike prices
+    T: the times to maturity
+    r: the risk-free interest rates
+    sigma: the volatilities
+    option_type: 'Call', 'Put' or an array of those strings
+    underlying: the underlying id of each contract; by default all contracts share one underlying, id 0
+
+    The per-contract invariants (ln K, K * exp(-rT), sigma * sqrt(T), the drift term (r + sigma^2 / 2) T, ...)
+    are computed once. Contracts are stored grouped by underlying, so a tick on one underlying refreshes a
+    contiguous slice of the preallocated result arrays in place, without allocating. The result attributes
+    (price, delta, gamma, theta, vega, rho, vanna, volga) are in this stored order; `order` holds the original
+    position of each stored contract and snapshot() returns copies in the original order.
+    '''
+
+    def __init__(self, S0, K, T, r, sigma, option_type='Call', underlying=None):
+        S0, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float).ravel() for x in (S0, K, T, r, sigma)))
+        n = S0.size
+        underlying = np.zeros(n, dtype=np.int64) if underlying is None else np.broadcast_to(underlying, n)
+        is_call = np.broadcast_to(np.asarray(option_type) == 'Call', n)
+
+        self.order = np.argsort(underlying, kind='stable')
+        ids, starts = np.unique(underlying[self.order], return_index=True)
+        stops = np.append(starts[1:], n)
+        self._slices = {key: slice(start, stop) for key, start, stop in zip(ids.tolist(), starts, stops)}
+        self.spot = {key: float(S0[self.order[sl.start]]) for key, sl in self._slices.items()}
+
+        self.K, self.T, self.r = (np.ascontiguousarray(x[self.order]) for x in (K, T, r))
+        self.sigma = np.ascontiguousarray(sigma[self.order])
+        self._sign = np.where(is_call[self.order], 1.0, -1.0)
+        self._log_K = np.log(self.K)
+        self._sqrt_T = np.sqrt(self.T)
+        self._disc_K = self.K * np.exp(-self.r * self.T)
+        self._disc_K_T = self._disc_K * self.T
+        self._r_disc_K = self.r * self._disc_K
+        self._sigma_sqrt_T = np.empty(n)
+        self._drift = np.empty(n)
+        self._half_sigma_over_sqrt_T = np.empty(n)
+        self._inv_sigma = np.empty(n)
+        self._refresh_vol(slice(0, n))
+
+        # spot-dependent intermediates and results, refreshed in place
+        self._d1, self._d2, self._pdf, self._N1, self._N2, self._tmp = (np.empty(n) for i in range(6))
+        self.price, self.delta, self.gamma, self.theta, self.vega, self.rho, self.vanna, self.volga = (
+            np.empty(n) for i in range(8))
+        for key in self._slices:
+            self._refresh_spot(key)
+
+    def __len__(self):
+        return self.K.size
+
+    def _refresh_vol(self, sl):
+        sigma, T = self.sigma[sl], self.T[sl]
+        np.multiply(sigma, self._sqrt_T[sl], out=self._sigma_sqrt_T[sl])
+        np.multiply(0.5 * sigma**2 + self.r[sl], T, out=self._drift[sl])
+        np.divide(0.5 * sigma, self._sqrt_T[sl], out=self._half_sigma_over_sqrt_T[sl])
+        np.divide(1.0, sigma, out=self._inv_sigma[sl])
+
+    def _refresh_spot(self, key):
+        sl = self._slices[key]
+        S = self.spot[key]
+        sign, sst = self._sign[sl], self._sigma_sqrt_T[sl]
+        d1, d2, pdf, N1, N2, tmp = (x[sl] for x in (self._d1, self._d2, self._pdf, self._N1, self._N2, self._tmp))
+
+        # d1 = (ln S - ln K + (r + sigma^2 / 2) T) / (sigma sqrt(T)), d2 = d1 - sigma sqrt(T)
+        np.subtract(np.log(S), self._log_K[sl], out=d1)
+        np.add(d1, self._drift[sl], out=d1)
+        np.divide(d1, sst, out=d1)
+        np.subtract(d1, sst, out=d2)
+        # n(d1), N(sign * d1), N(sign * d2)
+        np.multiply(d1, d1, out=pdf)
+        np.multiply(pdf, -0.5, out=pdf)
+        np.exp(pdf, out=pdf)
+        np.multiply(pdf, _INV_SQRT_2PI, out=pdf)
+        np.multiply(sign, d1, out=tmp)
+        _cdf(tmp, out=N1)
+        np.multiply(sign, d2, out=tmp)
+        _cdf(tmp, out=N2)
+
+        # delta = sign * N(sign * d1)
+        np.multiply(sign, N1, out=self.delta[sl])
+        # price = sign * (S N(sign * d1) - K e^(-rT) N(sign * d2))
+        np.multiply(self._disc_K[sl], N2, out=tmp)
+        np.multiply(self.delta[sl], S, out=self.price[sl])
+        np.multiply(sign, tmp, out=tmp)
+        np.subtract(self.price[sl], tmp, out=self.price[sl])
+        # gamma = n(d1) / (S sigma sqrt(T))
+        np.divide(pdf, sst, out=self.gamma[sl])
+        np.divide(self.gamma[sl], S, out=self.gamma[sl])
+        # vega = S n(d1) sqrt(T)
+        np.multiply(pdf, self._sqrt_T[sl], out=self.vega[sl])
+        np.multiply(self.vega[sl], S, out=self.vega[sl])
+        # theta = -S n(d1) sigma / (2 sqrt(T)) - sign * r K e^(-rT) N(sign * d2)
+        np.multiply(pdf, self._half_sigma_over_sqrt_T[sl], out=self.theta[sl])
+        np.multiply(self.theta[sl], -S, out=self.theta[sl])
+        np.multiply(self._r_disc_K[sl], N2, out=tmp)
+        np.multiply(sign, tmp, out=tmp)
+        np.subtract(self.theta[sl], tmp, out=self.theta[sl])
+        # rho = sign * K T e^(-rT) N(sign * d2)
+        np.multiply(self._disc_K_T[sl], N2, out=self.rho[sl])
+        np.multiply(sign, self.rho[sl], out=self.rho[sl])
+        # vanna = -n(d1) d2 / sigma, volga = vega d1 d2 / sigma
+        np.multiply(pdf, d2, out=self.vanna[sl])
+        np.multiply(self.vanna[sl], self._inv_sigma[sl], out=self.vanna[sl])
+        np.negative(self.vanna[sl], out=self.vanna[sl])
+        np.multiply(d1, d2, out=tmp)
+        np.multiply(tmp, self._inv_sigma[sl], out=tmp)
+        np.multiply(self.vega[sl], tmp, out=self.volga[sl])
+
+    def update_spot(self, underlying, S):
+        '''
+        Moves the spot of one underlying and refreshes the price and Greeks of its contracts only.
+        '''
+        self.spot[underlying] = float(S)
+        self._refresh_spot(underlying)
+
+    def update_sigma(self, underlying, sigma):
+        '''
+        Sets the volatility of the contracts on one underlying and refreshes their volatility invariants, price
+        and Greeks. sigma is a scalar, one value per contract of the book in the original contract order (the
+        values of the other underlyings' contracts are ignored), or one value per contract of this underlying
+        in their original relative order.
+        '''
+        sl = self._slices[underlying]
+        sigma = np.asarray(sigma, dtype=float)
+        if sigma.ndim and sigma.size == len(self):
+            sigma = sigma[self.order[sl]]
+        self.sigma[sl] = sigma
+        self._refresh_vol(sl)
+        self._refresh_spot(underlying)
+
+    def snapshot(self):
+        '''
+        Returns copies of the current prices and Greeks as a BookGreeks, in the original contract order.
+        '''
+        values = []
+        for name in BookGreeks._fields:
+            out = np.empty(len(self))
+            out[self.order] = getattr(self, name)
+            values.append(out)
+        return BookGreeks(*values)
@@ -0,0 +1,112 @@
+'''
+Normal distribution and Black-Scholes pricing kernels used by BSModel.
+
+When numba is installed the kernels are compiled: norm_cdf and norm_pdf are @vectorize ufuncs built on
+math.erfc, and bs_price evaluates the whole pricing formula in a single compiled loop without
+intermediate arrays. scenario_cube revalues a whole portfolio over a scenario grid in one fused, multi-threaded
+loop (see BSScenario). Without numba (or with the environment variable BSPRICER_NO_NUMBA set) they fall back
+to scipy.stats.norm, bs_price and scenario_cube are None, and BSModel and BSScenario keep their NumPy/SciPy
+code paths.
+
+The ufuncs accept scalars as well as arrays and broadcast like NumPy ufuncs.
+'''
+
+import math
+import os
+
+import numpy as np
+
+from scipy.stats import norm
+
+try:
+    if os.environ.get('BSPRICER_NO_NUMBA'):
+        raise ImportError
+    from numba import njit, prange, vectorize
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    _SQRT_2 = math.sqrt(2.0)
+    _INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+    @njit(cache=True, error_model='numpy')
+    def _ncdf(x):
+        # erfc keeps full relative precision in the left tail, where 0.5 * (1 + erf(x / sqrt(2))) cancels
+        return 0.5 * math.erfc(-x / _SQRT_2)
+
+    @njit(cache=True, error_model='numpy')
+    def _bs_price(S0, K, T, r, sigma, is_call):
+        sigma_sqrt_T = sigma * math.sqrt(T)
+        d1 = (math.log(S0 / K) + (r + 0.5 * sigma * sigma) * T) / sigma_sqrt_T
+        d2 = d1 - sigma_sqrt_T
+        disc_K = K * math.exp(-r * T)
+        if is_call:
+            return S0 * _ncdf(d1) - disc_K * _ncdf(d2)
+        return disc_K * _ncdf(-d2) - S0 * _ncdf(-d1)
+
+    @vectorize(['float64(float64)'], cache=True)
+    def norm_cdf(x):
+        return _ncdf(x)
+
+    @vectorize(['float64(float64)'], cache=True)
+    def norm_pdf(x):
+        return _INV_SQRT_2PI * math.exp(-0.5 * x * x)
+
+    @vectorize(['float64(float64, float64, float64, float64, float64, boolean)'], cache=True)
+    def bs_price(S0, K, T, r, sigma, is_call):
+        return _bs_price(S0, K, T, r, sigma, is_call)
+
+    # plain compiled function for a single quote: skips the ufunc dispatch, for the quote-by-quote hot path
+    bs_price_scalar = _bs_price
+
+    @njit(cache=True, error_model='numpy', parallel=True)
+    def scenario_cube(S, K, T, r, sigma, sign, quantity, base_price, dv, dr, dt, out):
+        # portfolio P&L and Greeks summed over positions into out[field, spot, vol, rate, days]; threads split
+        # the (vol, rate, days) scenarios, so each one owns its cells and sums them in a contiguous buffer
+        n_spot, n_vol, n_rate, n_days = S.size, dv.size, dr.size, dt.size
+        log_S = np.log(S)
+        for m in prange(n_vol * n_rate * n_days):
+            v = m // (n_rate * n_days)
+            k = m // n_days % n_rate
+            t = m % n_days
+            acc = np.zeros((6, n_spot))
+            for p in range(K.size):
+                q, sg, strike = quantity[p], sign[p], K[p]
+                vol = max(sigma[p] + dv[v], 1e-8)
+                rate = r[p] + dr[k]
+                tau = T[p] - dt[t]
+                if tau <= 0:
+                    for s in range(n_spot):
+                        intrinsic = sg * (S[s] - strike)
+                        acc[0, s] += q * (max(intrinsic, 0.0) - base_price[p])
+                        if intrinsic > 0:
+                            acc[1, s] += q * sg
+                    continue
+                sqrt_tau = math.sqrt(tau)
+                vol_sqrt_tau = vol * sqrt_tau
+                inv_vol_sqrt_tau = 1.0 / vol_sqrt_tau
+                disc_K = strike * math.exp(-rate * tau)
+                drift = (rate + 0.5 * vol * vol) * tau - math.log(strike)
+                half_vol_over_sqrt_tau = 0.5 * vol / sqrt_tau
+                for s in range(n_spot):
+                    d1 = (log_S[s] + drift) * inv_vol_sqrt_tau
+                    d2 = d1 - vol_sqrt_tau
+                    q_pdf = q * _INV_SQRT_2PI * math.exp(-0.5 * d1 * d1)
+                    delta = sg * _ncdf(sg * d1)
+                    q_disc_K_N2 = q * disc_K * sg * _ncdf(sg * d2)
+                    acc[0, s] += q * (S[s] * delta - base_price[p]) - q_disc_K_N2
+                    acc[1, s] += q * delta
+                    acc[2, s] += q_pdf * inv_vol_sqrt_tau / S[s]
+                    acc[3, s] += q_pdf * S[s] * sqrt_tau
+                    acc[4, s] -= q_pdf * S[s] * half_vol_over_sqrt_tau + rate * q_disc_K_N2
+                    acc[5, s] += tau * q_disc_K_N2
+            out[:, :, v, k, t] = acc
+
+else:
+    norm_cdf = norm.cdf
+    norm_pdf = norm.pdf
+    bs_price = None
+    bs_price_scalar = None
+    scenario_cube = None
@@ -1,7 +1,84 @@
+from collections import namedtuple
+from functools import partial
+
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr, ndtri, erfcx
 from scipy.optimize import minimize_scalar
 
+from BSKernels import norm_cdf, norm_pdf, bs_price, bs_price_scalar
+from BSParallel import run_parallel
+import BSProfile
+
+
+def _d1_d2(S0, K, T, r, sigma):
+    '''
+    Returns d1 and d2 of the Black-Scholes formula. Works element-wise on broadcastable NumPy arrays.
+    '''
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    d1 = (np.log(S0 / K) + (r + 0.5 * sigma**2) * T) / sigma_sqrt_T
+    return d1, d1 - sigma_sqrt_T
+
+
+GreeksResult = namedtuple('GreeksResult', [
+    'call', 'put', 'call_delta', 'put_delta', 'gamma', 'call_theta', 'put_theta',
+    'vega', 'call_rho', 'put_rho', 'vanna', 'volga'])
+
+
+def _greeks(S0, K, T, r, sigma):
+    '''
+    Evaluates the shared intermediates (d1, d2, sqrt(T), the discount factor and the normal pdf/cdf terms) once
+    and returns the call/put prices and every Greek as a GreeksResult. Works element-wise on broadcastable arrays.
+    '''
+    S0, K, T, r, sigma = (np.asarray(x, dtype=float) for x in (S0, K, T, r, sigma))
+    sqrt_T = np.sqrt(T)
+    d1, d2 = _d1_d2(S0, K, T, r, sigma)
+    disc_K = K * np.exp(-r * T)
+    pdf_d1 = norm_pdf(d1)
+    cdf_d1 = norm_cdf(d1)
+    cdf_d2 = norm_cdf(d2)
+    call = S0 * cdf_d1 - disc_K * cdf_d2
+    # the put Greeks use N(-x) = 1 - N(x); the put price keeps its own N(-x) terms so deep OTM puts stay accurate
+    put = disc_K * norm_cdf(-d2) - S0 * norm_cdf(-d1)
+    theta_common = -(S0 * pdf_d1 * sigma) / (2 * sqrt_T)
+    vega = S0 * pdf_d1 * sqrt_T
+    return GreeksResult(
+        call=call,
+        put=put,
+        call_delta=cdf_d1,
+        put_delta=cdf_d1 - 1,
+        gamma=pdf_d1 / (S0 * sigma * sqrt_T),
+        call_theta=theta_common - r * disc_K * cdf_d2,
+        put_theta=theta_common + r * disc_K * (1 - cdf_d2),
+        vega=vega,
+        call_rho=disc_K * T * cdf_d2,
+        put_rho=-disc_K * T * (1 - cdf_d2),
+        vanna=-pdf_d1 * d2 / sigma,
+        volga=vega * d1 * d2 / sigma,
+    )
+
+
+def _price(S0, K, T, r, sigma, is_call):
+    '''
+    Black-Scholes price of calls (is_call True) and puts, element-wise on broadcastable arrays.
+    Runs as one compiled ufunc when numba is available.
+    '''
+    if bs_price is not None:
+        return bs_price(S0, K, T, r, sigma, is_call)
+    S0, K, T, r, sigma = (np.asarray(x, dtype=float) for x in (S0, K, T, r, sigma))
+    d1, d2 = _d1_d2(S0, K, T, r, sigma)
+    disc_K = K * np.exp(-r * T)
+    # theta = +1 for calls and -1 for puts, so both types share one pair of normal cdf evaluations
+    theta = np.where(is_call, 1.0, -1.0)
+    return theta * (S0 * norm_cdf(theta * d1) - disc_K * norm_cdf(theta * d2))
+
+
+def _is_call(option_type):
+    '''
+    Maps 'Call'/'Put' (a single string or an array of strings) to a boolean array that is True for calls.
+    '''
+    return np.asarray(option_type) == 'Call'
+
+
 class BSModel:
     '''
     This class calculates the price and Greeks of a European call/put option using the Black-Scholes formula.
@@ -20,69 +97,366 @@ class BSModel:
         self.r = r
         self.sigma = sigma
 
+    def _scalar_inputs(self):
+        return (isinstance(self.S0, (float, int)) and isinstance(self.K, (float, int)) and isinstance(self.T, (float, int))
+                and isinstance(self.r, (float, int)) and isinstance(self.sigma, (float, int)))
+
     def bs_call(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return self.S0 * norm.cdf(d1) - self.K * np.exp(-self.r * self.T) * norm.cdf(d2)
+        if bs_price_scalar is not None and self._scalar_inputs():
+            return bs_price_scalar(self.S0, self.K, self.T, self.r, self.sigma, True)
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return self.S0 * norm_cdf(d1) - self.K * np.exp(-self.r * self.T) * norm_cdf(d2)
 
     def bs_put(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return self.K * np.exp(-self.r * self.T) * norm.cdf(-d2) - self.S0 * norm.cdf(-d1)
+        if bs_price_scalar is not None and self._scalar_inputs():
+            return bs_price_scalar(self.S0, self.K, self.T, self.r, self.sigma, False)
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return self.K * np.exp(-self.r * self.T) * norm_cdf(-d2) - self.S0 * norm_cdf(-d1)
     
     def bs_call_delta(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        return norm.cdf(d1)
+        d1, _ = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return norm_cdf(d1)
     
     def bs_put_delta(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        return -norm.cdf(-d1)
+        d1, _ = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return -norm_cdf(-d1)
     
     def bs_gamma(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        return norm.pdf(d1) / (self.S0 * self.sigma * np.sqrt(self.T))
+        d1, _ = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return norm_pdf(d1) / (self.S0 * self.sigma * np.sqrt(self.T))
     
     def bs_call_theta(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return -(self.S0 * norm.pdf(d1) * self.sigma) / (2 * np.sqrt(self.T)) - self.r * self.K * np.exp(-self.r * self.T) * norm.cdf(d2)
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return -(self.S0 * norm_pdf(d1) * self.sigma) / (2 * np.sqrt(self.T)) - self.r * self.K * np.exp(-self.r * self.T) * norm_cdf(d2)
 
     def bs_put_theta(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return -(self.S0 * norm.pdf(d1) * self.sigma) / (2 * np.sqrt(self.T)) + self.r * self.K * np.exp(-self.r * self.T) * norm.cdf(-d2)
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return -(self.S0 * norm_pdf(d1) * self.sigma) / (2 * np.sqrt(self.T)) + self.r * self.K * np.exp(-self.r * self.T) * norm_cdf(-d2)
 
     def bs_vega(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        return self.S0 * norm.pdf(d1) * np.sqrt(self.T) 
+        d1, _ = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return self.S0 * norm_pdf(d1) * np.sqrt(self.T) 
 
     def bs_call_rho(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return self.K * np.exp(-self.r * self.T) * self.T * norm.cdf(d2)
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return self.K * np.exp(-self.r * self.T) * self.T * norm_cdf(d2)
     
     def bs_put_rho(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return -self.K * np.exp(-self.r * self.T) * self.T * norm.cdf(-d2)
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return -self.K * np.exp(-self.r * self.T) * self.T * norm_cdf(-d2)
     
     def bs_vanna(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return -norm.pdf(d1) * d2 / self.sigma
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return -norm_pdf(d1) * d2 / self.sigma
     
     def bs_volga(self):
-        d1 = (np.log(self.S0 / self.K) + (self.r + 0.5 * self.sigma**2) * self.T) / (self.sigma * np.sqrt(self.T))
-        d2 = d1 - self.sigma * np.sqrt(self.T)
-        return self.S0 * norm.pdf(d1) * np.sqrt(self.T) * d1 * d2 / self.sigma
+        d1, d2 = _d1_d2(self.S0, self.K, self.T, self.r, self.sigma)
+        return self.S0 * norm_pdf(d1) * np.sqrt(self.T) * d1 * d2 / self.sigma
+
+    def greeks(self, workers=None):
+        '''
+        Returns the call/put prices and all Greeks at once as a GreeksResult, sharing d1, d2 and the
+        normal pdf/cdf evaluations between them. The attributes may be NumPy arrays; for large arrays,
+        workers splits the work across that many processes (0 for every CPU).
+        '''
+        if workers is None:
+            return _greeks(self.S0, self.K, self.T, self.r, self.sigma)
+        inputs = (self.S0, self.K, self.T, self.r, self.sigma)
+        return GreeksResult(*run_parallel(_greeks, inputs, [float] * len(GreeksResult._fields), workers))
+
+    @staticmethod
+    def price_batch(S0, K, T, r, sigma, option_type='Call', workers=None):
+        '''
+        Prices a whole option chain in one vectorized pass.
+
+        All inputs are scalars or NumPy arrays broadcastable against each other.
+        option_type is 'Call', 'Put' or an array of those strings (one per contract).
+        workers splits the chain across that many processes (0 for every CPU); by default it is priced in-process.
+        Returns an array of option prices with the broadcast shape of the inputs.
+        '''
+        if workers is None:
+            return _price(S0, K, T, r, sigma, _is_call(option_type))
+        price, = run_parallel(_price, (S0, K, T, r, sigma, _is_call(option_type)), [float], workers)
+        return price
+
+
+IVResult = namedtuple('IVResult', ['vol', 'converged', 'iterations'])
+
+
+def _corrado_miller_vol(S0, K, T, r, mkt_price, is_call):
+    '''
+    Corrado-Miller closed-form approximation of the implied volatility, used as the Newton starting point.
+    Falls back to the Brenner-Subrahmanyam at-the-money approximation where the Corrado-Miller root is undefined.
+    '''
+    disc_K = K * np.exp(-r * T)
+    call_price = np.where(is_call, mkt_price, mkt_price + S0 - disc_K)     # put-call parity
+    half_moneyness = 0.5 * (S0 - disc_K)
+    excess = call_price - half_moneyness
+    root = np.sqrt(np.maximum(excess**2 - (S0 - disc_K)**2 / np.pi, 0.0))
+    guess = np.sqrt(2 * np.pi / T) / (S0 + disc_K) * (excess + root)
+    brenner = np.sqrt(2 * np.pi / T) * call_price / S0
+    return np.where(np.isfinite(guess) & (guess > 0), guess, brenner)
+
+
+def _bisect_polish(S0, K, T, r, mkt_price, is_call, lo, hi):
+    '''
+    Brent polishing of a single quote inside its bracket [lo, hi], used for the few quotes the
+    vectorized Newton loop leaves unconverged.
+    '''
+    option_type = 'Call' if is_call else 'Put'
+    objective = lambda sigma: (BSModel.price_batch(S0, K, T, r, sigma, option_type) - mkt_price)**2
+    return minimize_scalar(objective, bounds=(lo, hi), method='bounded', options={'xatol': 1e-12}).x
+
+
+_MAX_VOL_DOUBLINGS = 10
+
+
+def _implied_vol_newton(S0, K, T, r, mkt_price, is_call, initial_vol=None, tol=1e-8, max_iter=100, max_vol=10.0):
+    '''
+    Safeguarded Newton solver that backs out the implied volatility of a whole array of quotes at once.
+
+    Every quote keeps a bracket [lo, hi] that is narrowed after each price evaluation. A Newton step that
+    leaves the bracket (or has no usable vega) is replaced by a bisection step, so the iteration cannot
+    diverge or go negative. The bracket starts at [0, max_vol], and max_vol is doubled for the quotes whose
+    price it does not reach, so a collapsed bracket always contains the root. Quotes outside the no-arbitrage
+    bounds, or with a root beyond max_vol * 2**_MAX_VOL_DOUBLINGS, get a NaN volatility and are not converged.
+    '''
+    S0, K, T, r, mkt_price, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S0, K, T, r, mkt_price)), np.asarray(is_call, dtype=bool))
+    shape = S0.shape
+    S0, K, T, r, mkt_price, is_call = (x.ravel() for x in (S0, K, T, r, mkt_price, is_call))
+
+    disc_K = K * np.exp(-r * T)
+    lower = np.where(is_call, np.maximum(S0 - disc_K, 0.0), np.maximum(disc_K - S0, 0.0))
+    upper = np.where(is_call, S0, disc_K)
+    valid = (mkt_price > lower) & (mkt_price < upper) & (T > 0)
+
+    if initial_vol is None:
+        sigma = _corrado_miller_vol(S0, K, T, r, mkt_price, is_call)
+    else:
+        sigma = np.broadcast_to(np.asarray(initial_vol, dtype=float), shape).ravel().copy()
+    lo = np.zeros_like(sigma)
+    hi = np.full_like(sigma, max_vol)
+    short = valid & (_price(S0, K, T, r, hi, is_call) < mkt_price)
+    for i in range(_MAX_VOL_DOUBLINGS):
+        if not short.any():
+            break
+        hi[short] *= 2
+        short[short] = _price(S0[short], K[short], T[short], r[short], hi[short], is_call[short]) < mkt_price[short]
+    valid &= ~short
+    sigma = np.where((sigma > lo) & (sigma < hi), sigma, 0.5 * (lo + hi))
+    vol = np.full_like(sigma, np.nan)
+    converged = np.zeros(sigma.shape, dtype=bool)
+    iterations = np.zeros(sigma.shape, dtype=np.int64)
+    theta = np.where(is_call, 1.0, -1.0)
+
+    active = np.flatnonzero(valid)
+    for i in range(max_iter):
+        if active.size == 0:
+            break
+        s = sigma[active]
+        sqrt_T = np.sqrt(T[active])
+        d1, d2 = _d1_d2(S0[active], K[active], T[active], r[active], s)
+        th = theta[active]
+        diff = th * (S0[active] * norm_cdf(th * d1) - disc_K[active] * norm_cdf(th * d2)) - mkt_price[active]
+        vega = S0[active] * norm_pdf(d1) * sqrt_T
+        iterations[active] += 1
+
+        # the price is increasing in sigma, so the sign of the error tells which side of the root we are on
+        lo[active] = np.where(diff < 0, s, lo[active])
+        hi[active] = np.where(diff > 0, s, hi[active])
+
+        # a price within tol is not enough for cheap, low-vega quotes: the implied volatility error diff / vega
+        # must be within tol as well, unless the bracket itself has shrunk below tol
+        done = ((np.abs(diff) < tol) & (np.abs(diff) < tol * vega)) | (hi[active] - lo[active] < tol)
+        vol[active[done]] = s[done]
+        converged[active[done]] = True
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s_new = s - diff / vega
+        bad_step = ~np.isfinite(s_new) | (s_new <= lo[active]) | (s_new >= hi[active])
+        sigma[active] = np.where(bad_step, 0.5 * (lo[active] + hi[active]), s_new)
+        active = active[~done]
+
+    for j in active:
+        vol[j] = _bisect_polish(S0[j], K[j], T[j], r[j], mkt_price[j], is_call[j], lo[j], hi[j])
+        converged[j] = abs(BSModel.price_batch(S0[j], K[j], T[j], r[j], vol[j], 'Call' if is_call[j] else 'Put')
+                           - mkt_price[j]) < tol
+
+    return IVResult(vol.reshape(shape), converged.reshape(shape), iterations.reshape(shape))
+
+
+_HOUSEHOLDER_STEPS = 4
+_LOWER_GUESS_STEPS = 4
+_RATIONAL_TOL = 1e-9        # relative residual |b(x, s) - beta| / beta of a converged solve
+
+
+def _mills_ratio(d):
+    '''
+    N(d) / n(d), evaluated through the scaled complementary error function so it stays accurate far in the left tail.
+    '''
+    return np.sqrt(0.5 * np.pi) * erfcx(-d / np.sqrt(2))
+
+
+def _normalised_black(x, s):
+    '''
+    Normalised Black call price b(x, s) = exp(x/2) N(x/s + s/2) - exp(-x/2) N(x/s - s/2), with x = ln(F/K) <= 0
+    the log-moneyness and s = sigma * sqrt(T) the total volatility.
+
+    Below the inflection point s_c = sqrt(2|x|) both normal terms are tiny and nearly cancel, so b is evaluated as
+    b'(s) * (N(d1)/n(d1) - N(d2)/n(d2)) instead, using exp(x/2) n(d1) = exp(-x/2) n(d2) = b'(s).
+    '''
+    d1 = x / s + 0.5 * s
+    d2 = x / s - 0.5 * s
+    with np.errstate(over='ignore', invalid='ignore'):
+        tail = _normalised_vega(x, s) * (_mills_ratio(d1) - _mills_ratio(d2))
+    body = np.exp(0.5 * x) * ndtr(d1) - np.exp(-0.5 * x) * ndtr(d2)
+    return np.where(d1 < 0, tail, body)
+
+
+def _normalised_vega(x, s):
+    '''
+    db/ds of the normalised Black price.
+    '''
+    return np.exp(-0.5 * (x / s)**2 - 0.125 * s**2) / np.sqrt(2 * np.pi)
+
+
+def _rational_initial_guess(x, beta):
+    '''
+    Closed-form initial guess for the total volatility, split at the inflection point s_c = sqrt(2|x|).
+
+    Above s_c the guess scales the distance to the upper bound exp(x/2) with N(-s/2), as in Jaeckel's
+    "By Implication". Below it, ln(beta) = ln b'(s) + ln(N(d1)/n(d1) - N(d2)/n(d2)) is inverted for s by a few
+    fixed-point sweeps started from the leading term s = |x| / sqrt(-2 ln(beta)). The sweeps diverge when the
+    root is close to the money (|x| / s below about sqrt(3)), so a sweep is kept only while it stays in (0, s_c).
+    As b is convex below s_c, its tangent at s_c gives a lower bound on the root, which replaces any guess below it.
+    '''
+    s_c = np.sqrt(2 * np.abs(x))
+    b_max = np.exp(0.5 * x)
+    b_c = _inflection_price(x)
+    lower_branch = beta < b_c
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        upper = -2 * ndtri((b_max - beta) / (b_max - b_c) * ndtr(-0.5 * s_c))
+        ln_beta = np.log(beta)
+        lower = np.abs(x) / np.sqrt(-2 * ln_beta)
+        lower = np.where(np.isfinite(lower) & (lower > 0) & (lower < s_c), lower, 0.5 * s_c)
+        for i in range(_LOWER_GUESS_STEPS):
+            ratio = _mills_ratio(x / lower + 0.5 * lower) - _mills_ratio(x / lower - 0.5 * lower)
+            sweep = np.abs(x) / np.sqrt(-2 * (ln_beta - np.log(ratio) + 0.5 * np.log(2 * np.pi) + 0.125 * lower**2))
+            lower = np.where(np.isfinite(sweep) & (sweep > 0) & (sweep < s_c), sweep, lower)
+        tangent = s_c - (b_c - beta) / _normalised_vega(x, s_c)
+        lower = np.where(np.isfinite(tangent) & (tangent > lower) & (tangent < s_c), tangent, lower)
+    return np.where(lower_branch, lower, upper), lower_branch
+
+
+def _inflection_price(x):
+    '''
+    The normalised price b(x, s_c) at the inflection point s_c = sqrt(2|x|); quotes below it have their root on
+    the lower branch s < s_c.
+    '''
+    s_c = np.sqrt(2 * np.abs(x))
+    return np.where(s_c > 0, _normalised_black(x, np.where(s_c > 0, s_c, 1.0)), 0.0)
+
+
+def _normalise_quote(S0, K, T, r, mkt_price, is_call):
+    '''
+    Maps quotes onto the normalised out-of-the-money call b(x, s) = beta with x <= 0. Returns x, beta (set to a
+    harmless placeholder for invalid quotes) and a boolean array flagging the quotes inside the no-arbitrage bounds.
+    '''
+    S0, K, T, r, mkt_price, is_call = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (S0, K, T, r, mkt_price)), np.asarray(is_call, dtype=bool))
+
+    F = S0 * np.exp(r * T)
+    x = np.log(F / K)
+    price = mkt_price * np.exp(r * T)       # undiscounted
+    # put-call parity turns in-the-money quotes into out-of-the-money ones, and the put/call
+    # symmetry b_put(x) = b_call(-x) maps everything onto x <= 0
+    otm_price = np.where(is_call == (x <= 0), price, price - np.where(is_call, 1.0, -1.0) * (F - K))
+    x = -np.abs(x)
+    beta = otm_price / np.sqrt(F * K)
+    valid = (beta > 0) & (beta < np.exp(0.5 * x)) & (T > 0)
+    beta = np.where(valid, beta, 0.5 * np.exp(0.5 * x))
+    return x, beta, valid
+
+
+def _householder_step(x, s, beta, use_log):
+    '''
+    One third-order Householder step on b(x, s) = beta for the total volatility s. use_log flags the quotes whose
+    root lies below the inflection point s_c = sqrt(2|x|); there the objective is ln(b / beta), which is close
+    to linear.
+
+    The step is kept on the root's side of s_c: a step across s_c, or a non-finite one (b underflowing far
+    below the root), moves halfway towards s_c instead (in log s below it), and a step to s <= 0 halves s.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        b = _normalised_black(x, s)
+        b1 = _normalised_vega(x, s)
+        # b''/b' and b'''/b'
+        h2 = x**2 / s**3 - 0.25 * s
+        h3 = h2**2 - 3 * x**2 / s**4 - 0.25
+        # on the lower branch the objective is g = ln(b / beta), with g' = b'/b = q,
+        # g''/g' = b''/b' - q and g'''/g' = b'''/b' - 3 q b''/b' + 2 q^2
+        q = b1 / b
+        f = np.where(use_log, np.log(b / beta), b - beta)
+        f1 = np.where(use_log, q, b1)
+        f2 = np.where(use_log, h2 - q, h2)
+        f3 = np.where(use_log, h3 - 3 * q * h2 + 2 * q**2, h3)
+        nu = -f / f1
+        step = nu * (1 + 0.5 * f2 * nu) / (1 + nu * (f2 + f3 * nu / 6))
+        s_c = np.sqrt(2 * np.abs(x))
+        s_new = s + step
+        crossed = np.where(use_log, s_new >= s_c, s_new < s_c)
+        s_new = np.where(~np.isfinite(step) | crossed, np.where(use_log, np.sqrt(s * s_c), 0.5 * (s + s_c)), s_new)
+        return np.where(s_new > 0, s_new, 0.5 * s)
+
+
+def _residual_converged(x, s, beta):
+    '''
+    Whether b(x, s) reproduces beta to a relative residual of _RATIONAL_TOL.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return np.abs(_normalised_black(x, s) - beta) <= _RATIONAL_TOL * beta
+
+
+def _implied_vol_rational(S0, K, T, r, mkt_price, is_call):
+    '''
+    Fixed-step implied volatility in the spirit of Jaeckel's "Let's Be Rational": the quote is normalised to an
+    out-of-the-money call b(x, s) on the forward, started from a closed-form guess on either side of the
+    inflection point, and refined with a fixed number of third-order Householder steps. Below the inflection
+    point the iteration runs on ln(b), which is close to linear there. Quotes outside the no-arbitrage bounds
+    get a NaN volatility. Returns the volatilities and a boolean array flagging the valid quotes whose final
+    price reproduces the quote (see _residual_converged).
+    '''
+    x, beta, valid = _normalise_quote(S0, K, T, r, mkt_price, is_call)
+    s, use_log = _rational_initial_guess(x, beta)
+    for i in range(_HOUSEHOLDER_STEPS):
+        s = _householder_step(x, s, beta, use_log)
+    return np.where(valid, s / np.sqrt(T), np.nan), valid & _residual_converged(x, s, beta)
+
+
+def _implied_vol_rational_result(S0, K, T, r, mkt_price, is_call):
+    vol, converged = _implied_vol_rational(S0, K, T, r, mkt_price, is_call)
+    return IVResult(vol, converged, np.where(np.isnan(vol), 0, _HOUSEHOLDER_STEPS))
+
+
+def _implied_vol_grid_result(S0, K, T, r, mkt_price, is_call):
+    from IVGrid import default_grid        # IVGrid builds on this module
+    return IVResult(*default_grid()._implied_vol(S0, K, T, r, mkt_price, is_call))
 
 
 class ImpliedVol():
     '''
     This class calculates the BSM implied volatility of a European call/put option using Newton's method.
+
+    method: 'newton' (default), 'rational' or 'grid'. The rational backend starts from a closed-form guess and
+    takes a fixed number of Householder steps, so it reaches machine precision with predictable latency. The grid
+    backend interpolates in a precomputed table (see IVGrid) and takes a single Householder step. Both ignore
+    initial_vol.
     '''
 
-    def __init__(self, S0, K, T, r, mkt_price, option_type, initial_vol):
+    def __init__(self, S0, K, T, r, mkt_price, option_type, initial_vol, method='newton'):
+        if method not in ('newton', 'rational', 'grid'):
+            raise ValueError(f"method must be 'newton', 'rational' or 'grid', got {method!r}")
         self.S0 = S0
         self.K = K
         self.T = T
@@ -90,8 +464,16 @@ class ImpliedVol():
         self.mkt_price = mkt_price
         self.option_type = option_type
         self.initial_vol = initial_vol
+        self.method = method
 
     def implied_vol(self):
+        if self.method == 'rational':
+            vol, _ = _implied_vol_rational(self.S0, self.K, self.T, self.r, self.mkt_price, self.option_type == 'Call')
+            return vol[()]
+        if self.method == 'grid':
+            return _implied_vol_grid_result(self.S0, self.K, self.T, self.r, self.mkt_price,
+                                            self.option_type == 'Call').vol[()]
+
         tol = 1e-8
         max_iter = 1000
         
@@ -101,25 +483,60 @@ class ImpliedVol():
         sigma = self.initial_vol            # initial guess
         
         for i in range(max_iter):
-            vega = self.S0 * norm.pdf(d1(sigma)) * np.sqrt(self.T)
+            vega = self.S0 * norm_pdf(d1(sigma)) * np.sqrt(self.T)
 
             if self.option_type == 'Call':
-                C = self.mkt_price - (self.S0 * norm.cdf(d1(sigma)) - self.K * np.exp(-self.r * self.T) * norm.cdf(d2(sigma)))
+                C = self.mkt_price - (self.S0 * norm_cdf(d1(sigma)) - self.K * np.exp(-self.r * self.T) * norm_cdf(d2(sigma)))
             else:
-                C = self.mkt_price - (self.K * np.exp(-self.r * self.T) * norm.cdf(-d2(sigma)) - self.S0 * norm.cdf(-d1(sigma)))
+                C = self.mkt_price - (self.K * np.exp(-self.r * self.T) * norm_cdf(-d2(sigma)) - self.S0 * norm_cdf(-d1(sigma)))
 
             sigma_new = sigma + C / vega
-            sigma = sigma_new
 
             if self.option_type == 'Call':
-                C_new = self.mkt_price - (self.S0 * norm.cdf(d1(sigma_new)) - self.K * np.exp(-self.r * self.T) * norm.cdf(d2(sigma_new)))
+                C_new = self.mkt_price - (self.S0 * norm_cdf(d1(sigma_new)) - self.K * np.exp(-self.r * self.T) * norm_cdf(d2(sigma_new)))
             else:
-                C_new = self.mkt_price - (self.K * np.exp(-self.r * self.T) * norm.cdf(-d2(sigma_new)) - self.S0 * norm.cdf(-d1(sigma_new)))
+                C_new = self.mkt_price - (self.K * np.exp(-self.r * self.T) * norm_cdf(-d2(sigma_new)) - self.S0 * norm_cdf(-d1(sigma_new)))
 
-            if abs(C_new) < tol or abs(sigma - sigma_new) < tol:
+            converged = abs(C_new) < tol or abs(sigma - sigma_new) < tol
+            if converged:
                 break
-        
+            sigma = sigma_new
+
+        prof = BSProfile.current()
+        if prof is not None:
+            prof.record_iv('scalar_newton', i + 1, converged)
         return sigma_new
+
+    @staticmethod
+    def implied_vol_batch(S0, K, T, r, mkt_price, option_type, initial_vol=None, tol=1e-8, max_iter=100,
+                          method='newton', workers=None):
+        '''
+        Backs out the implied volatility of a whole array of quotes in one vectorized pass.
+
+        All inputs are scalars or NumPy arrays broadcastable against each other; option_type is 'Call', 'Put'
+        or an array of those strings. With method='newton' a bracketed Newton method is used, started from
+        initial_vol or, without it, from the Corrado-Miller approximation. With method='rational' every quote
+        takes the same fixed number of Householder steps, and with method='grid' the volatility is interpolated in a
+        precomputed table and polished with one Householder step (for both, initial_vol, tol and max_iter are
+        ignored).
+        workers splits the quotes across that many processes (0 for every CPU); by default they are solved
+        in-process. Returns an IVResult with the volatilities (NaN for quotes outside the no-arbitrage bounds),
+        per-quote convergence flags and iteration counts.
+        '''
+        inputs = (S0, K, T, r, mkt_price, _is_call(option_type))
+        if method == 'rational':
+            kernel = _implied_vol_rational_result
+        elif method == 'grid':
+            kernel = _implied_vol_grid_result
+        elif method == 'newton':
+            kernel = partial(_implied_vol_newton, tol=tol, max_iter=max_iter)
+            if initial_vol is not None:
+                inputs += (initial_vol,)
+        else:
+            raise ValueError(f"method must be 'newton', 'rational' or 'grid', got {method!r}")
+        if workers is None:
+            return kernel(*inputs)
+        return IVResult(*run_parallel(kernel, inputs, [float, bool, np.int64], workers))
     
 
 
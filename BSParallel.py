@@ -0,0 +1,148 @@
+'''
+Multi-process execution of the vectorized BSModel kernels.
+
+The inputs are copied once into shared-memory blocks and every worker attaches to them by name, prices its
+slice [start, stop) and writes the result straight into shared output blocks. Nothing but the block names
+and slice bounds is pickled, and the results come back in input order regardless of which worker finishes
+first. With workers=None or 1 the kernel runs in the calling process on the whole input.
+
+The workers are not forked from the calling process (see _get_pool), so a script that passes workers must keep
+its top-level code under `if __name__ == '__main__':`.
+'''
+
+import atexit
+import multiprocessing
+import os
+from contextlib import suppress
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MIN_CHUNK_SIZE = 10_000
+CHUNKS_PER_WORKER = 4
+
+
+# one pool per worker count, kept alive between calls so repeated batches do not pay the process start-up
+_pools = {}
+
+
+def _get_pool(workers):
+    if workers not in _pools:
+        # forking copies the threads of numba's parallel kernels (BSScenario) in whatever state they are in and
+        # can deadlock the workers, so they are started from a clean forkserver process (or spawned)
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+    return _pools[workers]
+
+
+def shutdown():
+    '''
+    Stops the worker processes kept alive by run_parallel. They are also stopped at interpreter exit.
+    '''
+    while _pools:
+        _pools.popitem()[1].shutdown()
+
+
+atexit.register(shutdown)
+
+
+def _as_tuple(result):
+    return result if isinstance(result, tuple) else (result,)
+
+
+def _to_shared(array):
+    '''
+    Copies an array into a new shared-memory block. Returns the block and a picklable (name, dtype) spec.
+    '''
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, (block.name, array.dtype.str)
+
+
+def _attach(spec, n):
+    name, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray((n,), dtype=dtype, buffer=block.buf)
+
+
+def _run_chunk(kernel, input_specs, output_specs, n, start, stop):
+    '''
+    Worker entry point: applies kernel to rows [start, stop) of the shared inputs and writes the shared outputs.
+    '''
+    blocks = []
+    inputs, outputs = [], []
+    try:
+        for spec in input_specs:
+            block, array = _attach(spec, n)
+            blocks.append(block)
+            inputs.append(array[start:stop])
+        for spec in output_specs:
+            block, array = _attach(spec, n)
+            blocks.append(block)
+            outputs.append(array)
+        for out, values in zip(outputs, _as_tuple(kernel(*inputs))):
+            out[start:stop] = values
+    finally:
+        # the views must be gone before a block can be closed; if the kernel raised, its traceback may
+        # still hold some, and the mapping is then left to process exit
+        inputs = outputs = None
+        for block in blocks:
+            with suppress(BufferError):
+                block.close()
+
+
+def _chunk_bounds(n, workers, chunk_size):
+    if chunk_size is None:
+        chunk_size = max(MIN_CHUNK_SIZE, -(-n // (workers * CHUNKS_PER_WORKER)))
+    return [(start, min(start + chunk_size, n)) for start in range(0, n, chunk_size)]
+
+
+def run_parallel(kernel, inputs, out_dtypes, workers=None, chunk_size=None):
+    '''
+    Evaluates kernel(*inputs) element-wise, split into chunks across a pool of worker processes.
+
+    kernel: a module-level function (so it can be pickled by reference) taking 1-d arrays and returning one
+            array or a tuple of arrays of the same length
+    inputs: scalars or arrays broadcastable against each other
+    out_dtypes: the dtype of each array the kernel returns
+    workers: number of processes; None or 1 runs the kernel in this process, 0 uses every CPU
+    chunk_size: rows per task; by default the input is split into about four tasks per worker
+
+    Returns a tuple of arrays with the broadcast shape of the inputs, in input order.
+    '''
+    arrays = np.broadcast_arrays(*(np.asarray(x) for x in inputs))
+    shape = arrays[0].shape
+    if workers == 0:
+        workers = os.cpu_count()
+    if workers is None or workers <= 1:
+        return _as_tuple(kernel(*arrays))
+
+    arrays = [np.ascontiguousarray(a).ravel() for a in arrays]
+    n = arrays[0].size
+    blocks = []
+    try:
+        input_specs = []
+        for array in arrays:
+            block, spec = _to_shared(array)
+            blocks.append(block)
+            input_specs.append(spec)
+        output_specs = []
+        for dtype in out_dtypes:
+            block, spec = _to_shared(np.empty(n, dtype=dtype))
+            blocks.append(block)
+            output_specs.append(spec)
+
+        pool = _get_pool(workers)
+        futures = [pool.submit(_run_chunk, kernel, input_specs, output_specs, n, start, stop)
+                   for start, stop in _chunk_bounds(n, workers, chunk_size)]
+        for future in futures:
+            future.result()
+
+        # copy the results out of shared memory before the blocks are released
+        return tuple(np.ndarray((n,), dtype=dtype, buffer=blocks[len(arrays) + i].buf).reshape(shape).copy()
+                     for i, (name, dtype) in enumerate(output_specs))
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
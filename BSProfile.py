@@ -0,0 +1,270 @@
+'''
+Opt-in instrumentation of the pricing and implied volatility hot paths.
+
+    import BSProfile
+
+    with BSProfile.profile() as prof:
+        with BSProfile.stage('chain'):
+            ImpliedVol.implied_vol_batch(S0, K, T, r, mkt_price, option_type)
+    print(prof.to_prometheus())
+
+While a profile is active, the public BSModel and ImpliedVol methods and the normal cdf/pdf used by BSModel are
+wrapped to count calls, time them and record their batch sizes, the implied volatility solvers record their
+iterations and non-convergence, and stage() blocks record their wall time. Outside a profile nothing is wrapped:
+the only cost left is one context variable lookup per scalar Newton solve and per stage() block.
+
+The active profile is held in a context variable, so each thread (or asyncio task) records only its own calls
+into its own innermost profile, and overlapping profiles on different threads do not see each other's data.
+Calls made on threads started inside a profile are not recorded. The wrappers stay installed while any profile
+is active on any thread.
+'''
+
+import bisect
+import contextvars
+import inspect
+import json
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+import numpy as np
+
+SECONDS_BUCKETS = (1e-6, 4e-6, 1.6e-5, 6.4e-5, 2.56e-4, 1e-3, 4e-3, 1.6e-2, 6.4e-2, 0.256, 1.0, 4.0)
+SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 10, 20, 50, 100, 1000)
+
+# name: (type, help, buckets)
+METRICS = {
+    'bspricer_calls_total': ('counter', 'Calls of each instrumented function.', None),
+    'bspricer_call_seconds': ('histogram', 'Wall time of each call, in seconds.', SECONDS_BUCKETS),
+    'bspricer_batch_size': ('histogram', 'Contracts (or array elements) handled per call.', SIZE_BUCKETS),
+    'bspricer_iv_iterations': ('histogram', 'Solver iterations per implied volatility.', ITERATION_BUCKETS),
+    'bspricer_iv_unconverged_total': ('counter', 'Implied volatilities that did not converge.', None),
+    'bspricer_stage_seconds': ('histogram', 'Wall time of each stage() block, in seconds.', SECONDS_BUCKETS),
+}
+
+_active = contextvars.ContextVar('bspricer_profile', default=None)
+_installed = 0          # profiles active on any thread; the wrappers are installed while it is positive
+_originals = []
+_lock = threading.Lock()
+
+
+class Histogram:
+    '''
+    A Prometheus-style histogram: observation counts per bucket (upper bounds, plus +Inf), their sum and count.
+    '''
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value, n=1):
+        '''
+        Records n observations of value.
+        '''
+        self.counts[bisect.bisect_left(self.buckets, value)] += n
+        self.sum += value * n
+        self.count += n
+
+
+class Profiler:
+    '''
+    This class holds the counters and histograms recorded while it is the active profile (see profile()).
+    Metrics are keyed by name and labels; the names are those of METRICS.
+    '''
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(METRICS[name][2])
+            histogram.observe(value, n)
+
+    def record_iv(self, method, iterations, converged):
+        '''
+        Records the solver iterations and the non-converged count of one implied volatility or an array of them.
+        '''
+        for value, n in zip(*np.unique(iterations, return_counts=True)):
+            self.observe('bspricer_iv_iterations', value.item(), n.item(), method=method)
+        unconverged = np.size(converged) - np.count_nonzero(converged)
+        if unconverged:
+            self.count('bspricer_iv_unconverged_total', int(unconverged), method=method)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('bspricer_stage_seconds', time.perf_counter() - start, stage=name)
+
+    def to_dict(self):
+        '''
+        The recorded metrics as plain Python data: {name: {'type', 'help', 'samples': [...]}}, where a counter
+        sample is {'labels', 'value'} and a histogram sample is {'labels', 'buckets', 'counts', 'sum', 'count'}
+        with per-bucket (not cumulative) counts and '+Inf' as the last bucket.
+        '''
+        out = {}
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                out.setdefault(name, {'type': 'counter', 'help': METRICS[name][1], 'samples': []})['samples'].append(
+                    {'labels': dict(labels), 'value': value})
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                out.setdefault(name, {'type': 'histogram', 'help': METRICS[name][1], 'samples': []})['samples'].append(
+                    {'labels': dict(labels), 'buckets': list(histogram.buckets) + ['+Inf'],
+                     'counts': list(histogram.counts), 'sum': histogram.sum, 'count': histogram.count})
+        return out
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_prometheus(self):
+        '''
+        The recorded metrics in the Prometheus text exposition format.
+        '''
+        lines = []
+        for name, metric in self.to_dict().items():
+            lines.append(f'# HELP {name} {metric["help"]}')
+            lines.append(f'# TYPE {name} {metric["type"]}')
+            for sample in metric['samples']:
+                labels = sample['labels']
+                if metric['type'] == 'counter':
+                    lines.append(f'{name}{_format_labels(labels)} {sample["value"]}')
+                    continue
+                total = 0
+                for bound, count in zip(sample['buckets'], sample['counts']):
+                    total += count
+                    lines.append(f'{name}_bucket{_format_labels(dict(labels, le=_format_value(bound)))} {total}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(sample["sum"])}')
+                lines.append(f'{name}_count{_format_labels(labels)} {sample["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_value(value):
+    return value if isinstance(value, str) else repr(float(value))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _batch_size(result):
+    # the size of the first array of a namedtuple result (GreeksResult, IVResult) or of the result itself
+    if isinstance(result, tuple):
+        result = result[0]
+    return getattr(result, 'size', 1)
+
+
+def _instrument(func, name, after=None):
+    '''
+    Wraps func to record its calls, wall time and batch size into the active profile, and then to pass the
+    profile, the bound arguments and the result to after(), if given.
+    '''
+    signature = inspect.signature(func) if after is not None else None
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        prof = _active.get()
+        if prof is not None:
+            prof.count('bspricer_calls_total', function=name)
+            prof.observe('bspricer_call_seconds', elapsed, function=name)
+            prof.observe('bspricer_batch_size', _batch_size(result), function=name)
+            if after is not None:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                after(prof, bound.arguments, result)
+        return result
+
+    return wrapper
+
+
+def _after_iv_batch(prof, arguments, result):
+    prof.record_iv(arguments['method'], result.iterations, result.converged)
+
+
+def _targets():
+    import BSModel as model
+    targets = [(model, 'norm_cdf', None), (model, 'norm_pdf', None)]
+    targets += [(model.BSModel, name, None) for name in vars(model.BSModel)
+                if name.startswith('bs_') or name in ('greeks', 'price_batch')]
+    targets += [(model.ImpliedVol, 'implied_vol', None), (model.ImpliedVol, 'implied_vol_batch', _after_iv_batch)]
+    return targets
+
+
+def _install():
+    for owner, name, after in _targets():
+        original = vars(owner)[name]
+        func = original.__func__ if isinstance(original, staticmethod) else original
+        label = f'{owner.__name__}.{name}' if isinstance(owner, type) else name
+        wrapper = _instrument(func, label, after)
+        setattr(owner, name, staticmethod(wrapper) if isinstance(original, staticmethod) else wrapper)
+        _originals.append((owner, name, original))
+
+
+def _uninstall():
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+
+
+def current():
+    '''
+    The innermost Profiler active in the current context, or None.
+    '''
+    return _active.get()
+
+
+@contextmanager
+def profile(profiler=None):
+    '''
+    Activates a Profiler (a new one by default) in the current context for the duration of the block and yields
+    it. Profiles nest; calls are recorded into the innermost one, and the instrumentation is removed when the
+    last profile on any thread exits.
+    '''
+    global _installed
+    profiler = Profiler() if profiler is None else profiler
+    with _lock:
+        if not _installed:
+            _install()
+        _installed += 1
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        with _lock:
+            _installed -= 1
+            if not _installed:
+                _uninstall()
+
+
+def stage(name):
+    '''
+    A context manager that records the wall time of its block as a stage of the active profile (and does
+    nothing outside a profile).
+    '''
+    prof = _active.get()
+    return nullcontext() if prof is None else prof.stage(name)
@@ -0,0 +1,146 @@
+'''
+Scenario and stress-grid revaluation of a portfolio of European options on one underlying.
+'''
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from BSKernels import norm_cdf, norm_pdf, scenario_cube
+from BSModel import BSModel, _is_call
+
+ScenarioResult = namedtuple('ScenarioResult', ['pnl', 'delta', 'gamma', 'vega', 'theta', 'rho'])
+DAYS_PER_YEAR = 365.0
+DEFAULT_CHUNK_ELEMENTS = 2_000_000
+
+
+def _allocate(name, shape, out_dir):
+    if out_dir is None:
+        return np.zeros(shape)
+    return np.lib.format.open_memmap(os.path.join(out_dir, name + '.npy'), mode='w+', dtype=float, shape=shape)
+
+
+class ScenarioEngine:
+    '''
+    This class revalues a portfolio of European calls/puts on one underlying over a grid of spot, volatility,
+    rate and time shocks, and returns the P&L and Greeks of every scenario.
+
+    S0: the current spot of the underlying
+    K: the strike price of each position
+    T: the time to maturity of each position
+    r: the risk-free interest rate (one for the portfolio or one per position)
+    sigma: the volatility (one for the portfolio or one per position)
+    option_type: 'Call', 'Put' or an array of those strings
+    quantity: the signed number of contracts of each position
+    '''
+
+    def __init__(self, S0, K, T, r, sigma, option_type='Call', quantity=1.0):
+        K, T, r, sigma, quantity = (np.asarray(x, dtype=float) for x in (K, T, r, sigma, quantity))
+        K, T, r, sigma, quantity, is_call = (np.ravel(x) for x in
+                                             np.broadcast_arrays(K, T, r, sigma, quantity, _is_call(option_type)))
+        self.S0 = float(S0)
+        self.K, self.T, self.r, self.sigma, self.quantity = K, T, r, sigma, quantity
+        self._sign = np.where(is_call, 1.0, -1.0)
+        self.base_price = BSModel.price_batch(self.S0, K, T, r, sigma, np.where(is_call, 'Call', 'Put'))
+
+    def __len__(self):
+        return self.K.size
+
+    def run(self, spot_shocks=(0.0,), vol_shocks=(0.0,), rate_shocks=(0.0,), days=(0.0,), by_position=False,
+            out_dir=None, chunk_elements=DEFAULT_CHUNK_ELEMENTS):
+        '''
+        Revalues the portfolio on every combination of the shocks.
+
+        spot_shocks: relative moves of the spot (-0.1 is a 10% fall)
+        vol_shocks: absolute changes of the volatilities (0.05 adds 5 vol points; shocked vols are floored at 1e-8)
+        rate_shocks: absolute changes of the interest rates
+        days: calendar days elapsed; positions that expire are valued at their intrinsic value
+        by_position: keep one cube per position instead of summing over the portfolio
+        out_dir: if given, the results are written to memory-mapped .npy files in this directory (pnl.npy,
+                 delta.npy, ...), which keeps a by-position run larger than memory on disk
+        chunk_elements: the number of position x scenario values evaluated at a time by the NumPy code path
+                        (used without numba, and for by_position), which bounds memory
+
+        Returns a ScenarioResult of arrays of shape (spot, vol, rate, days), or (positions, spot, vol, rate, days)
+        with by_position, holding the P&L against the current value and the delta, gamma, vega, theta and rho,
+        all weighted by quantity. The Greeks have the units of BSModel's.
+        '''
+        spot, vol, rate, elapsed = (np.atleast_1d(np.asarray(x, dtype=float)) for x in
+                                    (spot_shocks, vol_shocks, rate_shocks, days))
+        grid = (spot.size, vol.size, rate.size, elapsed.size)
+        n = len(self)
+        if out_dir is not None:
+            os.makedirs(out_dir, exist_ok=True)
+        shape = (n,) + grid if by_position else grid
+        out = ScenarioResult(*(_allocate(name, shape, out_dir) for name in ScenarioResult._fields))
+
+        if scenario_cube is not None and not by_position:
+            # compiled: one fused pass that accumulates the portfolio sums without per-position temporaries
+            cube = np.zeros((len(ScenarioResult._fields),) + grid)
+            scenario_cube(self.S0 * (1 + spot), self.K, self.T, self.r, self.sigma, self._sign, self.quantity,
+                          self.base_price, vol, rate, elapsed / DAYS_PER_YEAR, cube)
+            for name, values in zip(ScenarioResult._fields, cube):
+                getattr(out, name)[...] = values
+            return self._flush(out)
+
+        # the scenario axes, shaped to broadcast against a leading position axis
+        S = (self.S0 * (1 + spot)).reshape(1, -1, 1, 1, 1)
+        dv = vol.reshape(1, 1, -1, 1, 1)
+        dr = rate.reshape(1, 1, 1, -1, 1)
+        dt = (elapsed / DAYS_PER_YEAR).reshape(1, 1, 1, 1, -1)
+        chunk = max(1, chunk_elements // int(np.prod(grid)))
+        for start in range(0, n, chunk):
+            sl = slice(start, min(start + chunk, n))
+            cube = self._revalue(sl, S, dv, dr, dt)
+            qty = self.quantity[sl]
+            cube['pnl'] = cube['pnl'] - self.base_price[sl].reshape(-1, 1, 1, 1, 1)
+            for name in ScenarioResult._fields:
+                if by_position:
+                    getattr(out, name)[sl] = qty.reshape(-1, 1, 1, 1, 1) * cube[name]
+                else:
+                    getattr(out, name)[...] += np.tensordot(qty, np.broadcast_to(cube[name], cube['pnl'].shape), 1)
+        return self._flush(out)
+
+    @staticmethod
+    def _flush(out):
+        for cube in out:
+            if isinstance(cube, np.memmap):
+                cube.flush()
+        return out
+
+    def _revalue(self, sl, S, dv, dr, dt):
+        '''
+        Price and Greeks of the positions in sl on every scenario, as arrays broadcasting to
+        (positions, spot, vol, rate, days).
+        '''
+        K, T, r, sigma, sign = (x[sl].reshape(-1, 1, 1, 1, 1) for x in (self.K, self.T, self.r, self.sigma, self._sign))
+        sigma = np.maximum(sigma + dv, 1e-8)
+        r = r + dr
+        T = T - dt
+        expired = T <= 0
+        T = np.where(expired, 1.0, T)          # any positive time; expired values are replaced below
+        sqrt_T = np.sqrt(T)
+        sigma_sqrt_T = sigma * sqrt_T
+        disc_K = K * np.exp(-r * T)
+
+        d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / sigma_sqrt_T
+        d2 = d1 - sigma_sqrt_T
+        pdf = norm_pdf(d1)
+        signed_N2 = sign * norm_cdf(sign * d2)
+        delta = sign * norm_cdf(sign * d1)
+        cube = {
+            'pnl': S * delta - disc_K * signed_N2,
+            'delta': delta,
+            'gamma': pdf / (S * sigma_sqrt_T),
+            'vega': S * pdf * sqrt_T,
+            'theta': -S * pdf * sigma / (2 * sqrt_T) - r * disc_K * signed_N2,
+            'rho': T * disc_K * signed_N2,
+        }
+        if expired.any():
+            intrinsic = sign * (S - K)
+            cube['pnl'] = np.where(expired, np.maximum(intrinsic, 0.0), cube['pnl'])
+            cube['delta'] = np.where(expired, np.where(intrinsic > 0, sign, 0.0), cube['delta'])
+            for name in ('gamma', 'vega', 'theta', 'rho'):
+                cube[name] = np.where(expired, 0.0, cube[name])
+        return cube
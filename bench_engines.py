@@ -0,0 +1,54 @@
+'''
+Accuracy against cost of the binomial-tree and Monte Carlo engines.
+
+    python bench_engines.py
+
+Prices an at-the-money European call with each tree method over a range of step counts, and shows the error
+against the closed form with the wall time. Then runs the Monte Carlo engine on the same call and on an
+arithmetic Asian call over a range of path counts, with and without antithetic draws and the control variate,
+and shows the standard error with the wall time.
+'''
+
+import argparse
+
+import numpy as np
+
+from BSEngines import BinomialTree, MonteCarlo
+from BSModel import BSModel
+
+S0, K, T, R, SIGMA = 100.0, 100.0, 1.0, 0.05, 0.2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--steps', type=int, nargs='+', default=[50, 100, 200, 500, 1000, 2000])
+    parser.add_argument('--paths', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    exact = BSModel(S0, K, T, R, SIGMA).bs_call()
+    print(f'European call S0={S0} K={K} T={T} r={R} sigma={SIGMA}, closed form {exact:.10f}')
+    print(f'{"engine":<16} {"steps":>8} {"price":>14} {"error":>10} {"time (s)":>10}')
+    for method in ('crr', 'leisen-reimer'):
+        for steps in args.steps:
+            tree = BinomialTree(S0, K, T, R, SIGMA, 'Call', steps=steps, method=method).price()
+            print(f'{method:<16} {tree.steps:>8} {tree.price:>14.10f} {tree.price - exact:>10.2e} {tree.elapsed:>10.4f}')
+
+    def asian(S):
+        return np.maximum(S.mean(axis=1) - K, 0.0)
+
+    print()
+    print(f'{"payoff":<8} {"antithetic":>10} {"control":>8} {"paths":>10} {"price":>10} {"stderr":>10} {"time (s)":>10}')
+    for name, payoff, steps in (('european', None, 1), ('asian', asian, 52)):
+        for antithetic, control_variate in ((False, False), (True, False), (True, True)):
+            if payoff is None and control_variate:
+                continue        # the control is the payoff itself: exact, with zero variance
+            for paths in args.paths:
+                mc = MonteCarlo(S0, K, T, R, SIGMA, 'Call', payoff=payoff, steps=steps, paths=paths,
+                                antithetic=antithetic, control_variate=control_variate, seed=args.seed).price()
+                print(f'{name:<8} {str(antithetic):>10} {str(control_variate):>8} {mc.paths:>10,} {mc.price:>10.5f} '
+                      f'{mc.stderr:>10.2e} {mc.elapsed:>10.4f}')
+
+
+if __name__ == '__main__':
+    main()
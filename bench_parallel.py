@@ -0,0 +1,66 @@
+'''
+Scaling benchmark of the multi-process batch pricing and implied volatility paths.
+
+    python bench_parallel.py --rows 2000000 --workers 1 2 4 8 16 32
+
+Prices a random chain and backs out its implied volatilities with BSModel.price_batch and
+ImpliedVol.implied_vol_batch for each worker count, and prints the wall time and the speedup
+against the single-process run (workers=None).
+'''
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from BSModel import BSModel, ImpliedVol
+
+
+def random_chain(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    K = rng.uniform(50, 150, rows)
+    T = rng.uniform(0.05, 2, rows)
+    sigma = rng.uniform(0.1, 0.8, rows)
+    option_type = np.where(rng.random(rows) < 0.5, 'Call', 'Put')
+    return 100.0, K, T, 0.03, sigma, option_type
+
+
+def best_time(func, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, 8, 16, 32, os.cpu_count()} & set(range(1, os.cpu_count() + 1))))
+    parser.add_argument('--iv-method', choices=['newton', 'rational', 'grid'], default='newton')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    S0, K, T, r, sigma, option_type = random_chain(args.rows)
+    mkt_price = BSModel.price_batch(S0, K, T, r, sigma, option_type)
+
+    print(f'{args.rows:,} contracts, {os.cpu_count()} CPUs, IV method {args.iv_method!r}')
+    print(f'{"workers":>8} {"price (s)":>10} {"speedup":>8} {"IV (s)":>10} {"speedup":>8}')
+    base_price = base_iv = None
+    for workers in [None] + args.workers:
+        price_time = best_time(lambda: BSModel.price_batch(S0, K, T, r, sigma, option_type, workers=workers),
+                               args.repeat)
+        iv_time = best_time(lambda: ImpliedVol.implied_vol_batch(S0, K, T, r, mkt_price, option_type,
+                                                                 method=args.iv_method, workers=workers),
+                            args.repeat)
+        if workers is None:
+            base_price, base_iv = price_time, iv_time
+        label = 'inline' if workers is None else workers
+        print(f'{label:>8} {price_time:>10.3f} {base_price / price_time:>7.2f}x {iv_time:>10.3f} {base_iv / iv_time:>7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+'''
+Load generator for the bsserver pricing service.
+
+    python -m bsserver --port 8787 &
+    python bench_server.py --port 8787 --connections 64 --duration 10
+
+or, to start a server for the run:
+
+    python bench_server.py --spawn --window-us 300 --connections 64
+
+Each client process keeps --connections HTTP/1.1 keep-alive connections busy, sending one request at a time per
+connection for --duration seconds, and the latency of every request is recorded. Prints the number of requests,
+the throughput and the p50/p99/max latency, and the server's batching statistics. Use --window-us 0 with
+--spawn to compare against pricing each request on its own.
+'''
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from multiprocessing import Pool
+
+import numpy as np
+
+
+def _request_bodies(endpoint, chain, count, seed):
+    rng = np.random.default_rng(seed)
+    bodies = []
+    for i in range(count):
+        K = rng.uniform(80, 120, chain).round(2)
+        T = rng.uniform(0.1, 2, chain).round(3)
+        body = {'S0': 100.0, 'K': K.tolist(), 'T': T.tolist(), 'r': 0.03,
+                'option_type': np.where(rng.random(chain) < 0.5, 'Call', 'Put').tolist()}
+        if endpoint == '/iv':
+            body['mkt_price'] = rng.uniform(2, 10, chain).round(2).tolist()
+        else:
+            body['sigma'] = rng.uniform(0.1, 0.6, chain).round(3).tolist()
+        if chain == 1:
+            body = {name: value[0] if isinstance(value, list) else value for name, value in body.items()}
+        bodies.append(json.dumps(body).encode())
+    return bodies
+
+
+async def _connection(host, port, endpoint, bodies, deadline, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            body = bodies[i % len(bodies)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(f'POST {endpoint} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.partition(b':')
+                if name.strip().lower() == b'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+    finally:
+        writer.close()
+    return errors
+
+
+def _client(args):
+    host, port, endpoint, connections, chain, duration, seed = args
+    bodies = _request_bodies(endpoint, chain, 256, seed)
+    latencies = []
+
+    async def run():
+        deadline = time.perf_counter() + duration
+        return sum(await asyncio.gather(*(_connection(host, port, endpoint, bodies, deadline, latencies)
+                                          for i in range(connections))))
+
+    errors = asyncio.run(run())
+    return np.array(latencies), errors
+
+
+def _wait_for_server(url, timeout=30):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url + '/health') as response:
+                return json.load(response)
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--endpoint', choices=['/price', '/iv'], default='/price')
+    parser.add_argument('--connections', type=int, default=64, help='concurrent connections per client process')
+    parser.add_argument('--processes', type=int, default=1, help='client processes')
+    parser.add_argument('--chain', type=int, default=1, help='contracts per request')
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds of load')
+    parser.add_argument('--spawn', action='store_true', help='start a bsserver for the run')
+    parser.add_argument('--window-us', type=float, default=300.0, help='batching window of the spawned server')
+    args = parser.parse_args()
+
+    url = f'http://{args.host}:{args.port}'
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, '-m', 'bsserver', '--host', args.host, '--port', str(args.port),
+                                   '--window-us', str(args.window_us)],
+                                  cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL)
+    try:
+        before = _wait_for_server(url)['stats'][args.endpoint]
+        tasks = [(args.host, args.port, args.endpoint, args.connections, args.chain, args.duration, seed)
+                 for seed in range(args.processes)]
+        with Pool(args.processes) as pool:
+            results = pool.map(_client, tasks)
+        after = _wait_for_server(url)['stats'][args.endpoint]
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies = np.concatenate([latency for latency, errors in results])
+    errors = sum(errors for latency, errors in results)
+    batches = after['batches'] - before['batches']
+    requests = after['requests'] - before['requests']
+    print(f'{args.endpoint}: {args.processes} x {args.connections} connections, {args.chain} contract(s) per request')
+    print(f'requests      {latencies.size:,} ({errors} errors)')
+    print(f'throughput    {latencies.size / args.duration:,.0f} req/s, '
+          f'{latencies.size * args.chain / args.duration:,.0f} contracts/s')
+    print(f'latency       p50 {np.percentile(latencies, 50) * 1e3:.2f} ms, '
+          f'p99 {np.percentile(latencies, 99) * 1e3:.2f} ms, max {latencies.max() * 1e3:.2f} ms')
+    print(f'batching      {batches:,} batches, {requests / max(batches, 1):.1f} requests per batch')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+'''
+Benchmark suite and accuracy regression harness for BSModel and ImpliedVol.
+
+    python benchmark.py --json results.json                       # run and save
+    python benchmark.py --compare baseline.json --json new.json   # run, diff against a saved run
+
+Timings cover the scalar pricing and Greek methods, the batch kernels, the implied volatility solvers on a
+moneyness x maturity grid and the full data-generation pass of the Streamlit app (main.py, if streamlit is
+installed). Accuracy checks cover textbook reference values, put-call parity, the analytic Greeks against
+central finite differences, implied volatility round trips, the rational backend against Newton, the
+lookup grid against the rational backend and the tree and Monte Carlo engines against the closed form.
+
+With --compare the run exits with status 1 if an accuracy check fails or a benchmark got slower than
+--max-slowdown times its baseline.
+'''
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+import warnings
+
+import numpy as np
+
+import BSKernels
+from BSEngines import BinomialTree, MonteCarlo
+from BSModel import BSModel, ImpliedVol
+from BSScenario import ScenarioEngine
+
+# scalar inputs of the app's default parameters
+S0, K, T, R, SIGMA = 90.0, 100.0, 2.0, 0.05, 0.1
+GREEK_METHODS = ['bs_call', 'bs_put', 'bs_call_delta', 'bs_put_delta', 'bs_gamma', 'bs_call_theta', 'bs_put_theta',
+                 'bs_vega', 'bs_call_rho', 'bs_put_rho', 'bs_vanna', 'bs_volga']
+
+
+def time_call(func, repeat=5, min_time=0.05):
+    '''
+    Best and mean time of one call of func, from `repeat` rounds of enough calls to last at least min_time.
+    '''
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    times = [t / number for t in timer.repeat(repeat, number)]
+    return {'best_s': min(times), 'mean_s': float(np.mean(times)), 'calls_per_round': number}
+
+
+def random_chain(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    K = S0 * np.exp(rng.uniform(-0.5, 0.5, rows))
+    T = rng.uniform(0.02, 3.0, rows)
+    sigma = rng.uniform(0.05, 1.0, rows)
+    option_type = np.where(rng.random(rows) < 0.5, 'Call', 'Put')
+    return K, T, sigma, option_type
+
+
+def iv_grid():
+    '''
+    Quotes on a moneyness x maturity grid, priced at a 25% volatility.
+    '''
+    moneyness, maturity = np.meshgrid(np.linspace(0.7, 1.3, 13), np.array([1 / 52, 1 / 12, 0.25, 0.5, 1.0, 2.0]))
+    strikes = S0 * moneyness.ravel()
+    maturities = maturity.ravel()
+    option_type = np.where(strikes >= S0, 'Call', 'Put')          # out-of-the-money quotes
+    prices = BSModel.price_batch(S0, strikes, maturities, R, 0.25, option_type)
+    return strikes, maturities, option_type, prices
+
+
+def run_timings(rows, quick):
+    repeat = 3 if quick else 5
+    results = {}
+
+    model = BSModel(S0, K, T, R, SIGMA)
+    for name in GREEK_METHODS:
+        results[f'scalar.{name}'] = time_call(getattr(model, name), repeat)
+    results['scalar.greeks'] = time_call(model.greeks, repeat)
+
+    strikes, maturities, option_type, prices = iv_grid()
+
+    def scalar_grid():
+        for k, t, o, p in zip(strikes, maturities, option_type, prices):
+            ImpliedVol(S0, k, t, R, p, o, 0.2).implied_vol()
+    results['scalar.implied_vol_grid'] = time_call(scalar_grid, repeat)
+
+    chain_K, chain_T, chain_sigma, chain_type = random_chain(rows)
+    chain_price = BSModel.price_batch(S0, chain_K, chain_T, R, chain_sigma, chain_type)
+    results['batch.price_batch'] = time_call(lambda: BSModel.price_batch(S0, chain_K, chain_T, R, chain_sigma,
+                                                                         chain_type), repeat)
+    results['batch.greeks'] = time_call(lambda: BSModel(S0, chain_K, chain_T, R, chain_sigma).greeks(), repeat)
+    for method in ('newton', 'rational', 'grid'):
+        results[f'batch.implied_vol_{method}'] = time_call(
+            lambda: ImpliedVol.implied_vol_batch(S0, chain_K, chain_T, R, chain_price, chain_type, method=method),
+            repeat)
+    results['engines.tree_leisen_reimer_500'] = time_call(lambda: BinomialTree(S0, K, T, R, SIGMA, 'Put', american=True,
+                                                                               steps=500).price(), repeat)
+    portfolio = ScenarioEngine(S0, chain_K[:1000], chain_T[:1000], R, chain_sigma[:1000], chain_type[:1000])
+    results['scenario.portfolio_1k_16k'] = time_call(lambda: portfolio.run(
+        np.linspace(-0.3, 0.3, 40), np.linspace(-0.15, 0.15, 40), 0.0, np.linspace(0, 30, 10)), repeat)
+    results['engines.monte_carlo_1m'] = time_call(lambda: MonteCarlo(S0, K, T, R, SIGMA, control_variate=False,
+                                                                     seed=0).price(), repeat)
+
+    app = time_app(repeat)
+    if app is not None:
+        results['app.main'] = app
+    for stats in results.values():
+        stats['per_row_s'] = None
+    for name in ('batch.price_batch', 'batch.greeks', 'batch.implied_vol_newton', 'batch.implied_vol_rational',
+                 'batch.implied_vol_grid'):
+        results[name]['per_row_s'] = results[name]['best_s'] / rows
+    return results
+
+
+def time_app(repeat):
+    '''
+    Wall time of one uncached run of main.py through streamlit's headless AppTest, or None without streamlit.
+    '''
+    try:
+        import streamlit as st
+        from streamlit.testing.v1 import AppTest
+    except ImportError:
+        return None
+
+    times = []
+    for i in range(repeat):
+        st.cache_data.clear()
+        app = AppTest.from_file('main.py', default_timeout=120)
+        start = time.perf_counter()
+        app.run()
+        times.append(time.perf_counter() - start)
+        if app.exception:
+            raise RuntimeError(f'main.py raised: {app.exception[0].value}')
+    return {'best_s': min(times), 'mean_s': float(np.mean(times)), 'calls_per_round': 1}
+
+
+def check(value, tolerance):
+    '''
+    An accuracy result; with tolerance None it is only recorded, not gated.
+    '''
+    value = float(value)
+    return {'value': value, 'tolerance': tolerance, 'passed': tolerance is None or bool(value <= tolerance)}
+
+
+def run_accuracy():
+    results = {}
+
+    # the textbook example of Hull, Options, Futures and Other Derivatives: S=42, K=40, r=10%, sigma=20%, T=0.5
+    # gives c = 4.76 and p = 0.81; the references below are the same values to full double precision
+    hull = BSModel(42.0, 40.0, 0.5, 0.1, 0.2)
+    results['reference.hull_call'] = check(abs(hull.bs_call() - 4.759422392871532), 1e-10)
+    results['reference.hull_put'] = check(abs(hull.bs_put() - 0.8085993729000922), 1e-10)
+
+    chain_K, chain_T, chain_sigma, chain_type = random_chain(20_000, seed=1)
+    g = BSModel(S0, chain_K, chain_T, R, chain_sigma).greeks()
+    parity = g.call - g.put - (S0 - chain_K * np.exp(-R * chain_T))
+    results['parity.max_abs_error'] = check(np.max(np.abs(parity)), 1e-10)
+
+    # central finite differences of the batch prices against the analytic Greeks
+    def price(call, S=S0, K=chain_K, T=chain_T, r=R, sigma=chain_sigma):
+        return BSModel.price_batch(S, K, T, r, sigma, 'Call' if call else 'Put')
+
+    h_S, h_sigma, h_T, h_r = 1e-3 * S0, 1e-4, 1e-5, 1e-5
+    fd = {
+        'call_delta': (price(True, S=S0 + h_S) - price(True, S=S0 - h_S)) / (2 * h_S),
+        'put_delta': (price(False, S=S0 + h_S) - price(False, S=S0 - h_S)) / (2 * h_S),
+        'gamma': (price(True, S=S0 + h_S) - 2 * price(True) + price(True, S=S0 - h_S)) / h_S**2,
+        'vega': (price(True, sigma=chain_sigma + h_sigma) - price(True, sigma=chain_sigma - h_sigma)) / (2 * h_sigma),
+        'call_theta': -(price(True, T=chain_T + h_T) - price(True, T=chain_T - h_T)) / (2 * h_T),
+        'put_theta': -(price(False, T=chain_T + h_T) - price(False, T=chain_T - h_T)) / (2 * h_T),
+        'call_rho': (price(True, r=R + h_r) - price(True, r=R - h_r)) / (2 * h_r),
+        'put_rho': (price(False, r=R + h_r) - price(False, r=R - h_r)) / (2 * h_r),
+    }
+    delta_up = BSModel(S0, chain_K, chain_T, R, chain_sigma + h_sigma).greeks()
+    delta_down = BSModel(S0, chain_K, chain_T, R, chain_sigma - h_sigma).greeks()
+    fd['vanna'] = (delta_up.call_delta - delta_down.call_delta) / (2 * h_sigma)
+    fd['volga'] = (delta_up.vega - delta_down.vega) / (2 * h_sigma)
+    for name, approx in fd.items():
+        analytic = getattr(g, name)
+        error = np.abs(approx - analytic) / np.maximum(np.abs(analytic), 1.0)
+        results[f'greeks.fd_{name}'] = check(np.max(error), 1e-3)
+
+    # the per-Greek methods against the single-pass kernel
+    model = BSModel(S0, chain_K[:1000], chain_T[:1000], R, chain_sigma[:1000])
+    single_pass = model.greeks()
+    worst = max(np.max(np.abs(getattr(model, name)() - getattr(single_pass, name[len('bs_'):])))
+                for name in GREEK_METHODS)
+    results['greeks.methods_vs_greeks'] = check(worst, 1e-10)
+
+    # implied volatility round trips on a moneyness x maturity grid and a random chain
+    strikes, maturities, option_type, prices = iv_grid()
+    # the scalar solver is plain Newton without a bracket; record how many grid quotes it gets right
+    scalar = np.array([ImpliedVol(S0, k, t, R, p, o, 0.2).implied_vol()
+                       for k, t, o, p in zip(strikes, maturities, option_type, prices)])
+    results['iv.scalar_newton_grid_solved'] = check(np.mean(np.abs(scalar - 0.25) < 1e-6), None)
+    for method in ('newton', 'rational', 'grid'):
+        iv = ImpliedVol.implied_vol_batch(S0, strikes, maturities, R, prices, option_type, method=method)
+        results[f'iv.{method}_grid'] = check(np.max(np.abs(iv.vol - 0.25)), 1e-6 if method == 'newton' else 1e-10)
+
+    chain_price = BSModel.price_batch(S0, chain_K, chain_T, R, chain_sigma, chain_type)
+    newton = ImpliedVol.implied_vol_batch(S0, chain_K, chain_T, R, chain_price, chain_type, method='newton')
+    rational = ImpliedVol.implied_vol_batch(S0, chain_K, chain_T, R, chain_price, chain_type, method='rational')
+    # quotes whose vega is negligible (deep in or out of the money) carry no volatility information
+    vega = BSModel(S0, chain_K, chain_T, R, chain_sigma).greeks().vega
+    meaningful = vega > 1e-2
+    results['iv.newton_unconverged'] = check(np.mean(~newton.converged[meaningful]), 0.0)
+    results['iv.rational_unconverged'] = check(np.mean(~rational.converged[meaningful]), 0.0)
+    results['iv.newton_reprice_error'] = check(np.max(np.abs(
+        BSModel.price_batch(S0, chain_K, chain_T, R, newton.vol, chain_type) - chain_price)[newton.converged]), 1e-8)
+    results['iv.rational_reprice_error'] = check(np.max(np.abs(
+        BSModel.price_batch(S0, chain_K, chain_T, R, rational.vol, chain_type) - chain_price)[rational.converged]), 1e-10)
+    results['iv.rational_vs_newton'] = check(np.max(np.abs(rational.vol - newton.vol)[meaningful]), 1e-7)
+    grid = ImpliedVol.implied_vol_batch(S0, chain_K, chain_T, R, chain_price, chain_type, method='grid')
+    results['iv.grid_vs_rational'] = check(np.max(np.abs(grid.vol - rational.vol)[meaningful]), 1e-10)
+
+    # the engines against the closed form, and the American put of Longstaff and Schwartz (S=36, K=40, r=6%,
+    # sigma=20%, T=1), whose converged tree value is 4.48667
+    tree = BinomialTree(S0, chain_K[:200], chain_T[:200], R, chain_sigma[:200], chain_type[:200], steps=501).price()
+    exact = BSModel.price_batch(S0, chain_K[:200], chain_T[:200], R, chain_sigma[:200], chain_type[:200])
+    results['engines.tree_european'] = check(np.max(np.abs(tree.price - exact)), 1e-3)
+    tree_g = BSModel(S0, chain_K[:200], chain_T[:200], R, chain_sigma[:200]).greeks()
+    is_call = chain_type[:200] == 'Call'
+    results['engines.tree_delta'] = check(np.max(np.abs(
+        tree.delta - np.where(is_call, tree_g.call_delta, tree_g.put_delta))), 1e-3)
+    results['engines.tree_gamma'] = check(np.max(np.abs(tree.gamma - tree_g.gamma)), 1e-3)
+    american = BinomialTree(36.0, 40.0, 1.0, 0.06, 0.2, 'Put', american=True, steps=2001).price()
+    results['engines.tree_american_put'] = check(abs(american.price - 4.48667), 1e-3)
+    mc = MonteCarlo(S0, K, T, R, SIGMA, control_variate=False, seed=0).price()
+    results['engines.monte_carlo_zscore'] = check(abs(mc.price - BSModel(S0, K, T, R, SIGMA).bs_call()) / mc.stderr, 4.0)
+
+    # the portfolio P&L of a shocked scenario against repricing every position with BSModel
+    scenario = ScenarioEngine(S0, chain_K[:200], chain_T[:200], R, chain_sigma[:200], chain_type[:200],
+                              np.arange(200) % 7 - 3.0)
+    cube = scenario.run([-0.1, 0.0, 0.1], [0.05], [0.01], [10.0])
+    repriced = BSModel.price_batch(S0 * 1.1, chain_K[:200], chain_T[:200] - 10 / 365, R + 0.01,
+                                   chain_sigma[:200] + 0.05, chain_type[:200])
+    results['scenario.pnl_vs_repricing'] = check(abs(cube.pnl[2, 0, 0, 0] - scenario.quantity @ (
+        repriced - scenario.base_price)), 1e-9)
+    return results
+
+
+def compare(current, baseline, max_slowdown):
+    '''
+    Prints the timing ratios against a baseline run and returns the names of the regressions.
+    '''
+    regressions = [name for name, stats in current['accuracy'].items() if not stats['passed']]
+    print(f'\n{"benchmark":<32} {"baseline":>12} {"current":>12} {"ratio":>7}')
+    for name, stats in current['timings'].items():
+        if name not in baseline.get('timings', {}):
+            continue
+        ratio = stats['best_s'] / baseline['timings'][name]['best_s']
+        flag = ''
+        if ratio > max_slowdown:
+            regressions.append(name)
+            flag = '  SLOWER'
+        print(f'{name:<32} {baseline["timings"][name]["best_s"]:>12.3e} {stats["best_s"]:>12.3e} {ratio:>6.2f}x{flag}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--json', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file written by an earlier run')
+    parser.add_argument('--max-slowdown', type=float, default=1.25,
+                        help='timing ratio against the baseline above which a benchmark counts as a regression')
+    parser.add_argument('--rows', type=int, default=100_000, help='contracts in the batch benchmarks')
+    parser.add_argument('--quick', action='store_true', help='fewer timing rounds')
+    args = parser.parse_args()
+    # the degenerate corners of the grids (T = 0 in the app, diverging scalar Newton) warn by design
+    warnings.simplefilter('ignore', RuntimeWarning)
+
+    results = {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'numba': BSKernels.HAS_NUMBA,
+                 'machine': platform.machine(), 'rows': args.rows,
+                 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'accuracy': run_accuracy(),
+        'timings': run_timings(args.rows, args.quick),
+    }
+
+    print(f'{"accuracy check":<32} {"value":>12} {"tolerance":>12}')
+    for name, stats in results['accuracy'].items():
+        status = '' if stats['passed'] else '  FAILED'
+        tolerance = '-' if stats['tolerance'] is None else f'{stats["tolerance"]:.1e}'
+        print(f'{name:<32} {stats["value"]:>12.3e} {tolerance:>12}{status}')
+    print(f'\n{"benchmark":<32} {"best (s)":>12} {"mean (s)":>12}')
+    for name, stats in results['timings'].items():
+        print(f'{name:<32} {stats["best_s"]:>12.3e} {stats["mean_s"]:>12.3e}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    failed = [name for name, stats in results['accuracy'].items() if not stats['passed']]
+    if args.compare:
+        with open(args.compare) as f:
+            failed = compare(results, json.load(f), args.max_slowdown)
+    if failed:
+        print(f'\nregressions: {", ".join(failed)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+'''
+Headless batch pricing of position files with the BSModel math.
+
+    python -m bspricer price positions.parquet -o priced.parquet
+
+The input is streamed in fixed-size chunks, so memory stays bounded whatever the file size. Supported inputs are
+Parquet (.parquet/.pq, needs pyarrow), CSV (.csv) and a directory of memory-mapped .npy column files. The same
+formats are accepted for the output; a .npy directory output needs the row count up front, so it is only
+available for Parquet and .npy inputs.
+
+Input columns: S0, K, T, r, sigma and optionally option_type ('Call'/'Put', defaults to 'Call' when the column
+is missing; other values are an error) and mkt_price. The numeric columns are written back as float64.
+Output columns: the input columns, the price and Greeks of each contract and, when mkt_price is given, the
+implied volatility with its convergence flag.
+'''
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from BSModel import BSModel, ImpliedVol, _is_call
+
+INPUT_COLUMNS = ['S0', 'K', 'T', 'r', 'sigma']
+GREEK_COLUMNS = ['price', 'delta', 'gamma', 'theta', 'vega', 'rho', 'vanna', 'volga']
+DEFAULT_CHUNK_SIZE = 500_000
+
+
+def _file_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        return 'parquet'
+    if ext == '.csv':
+        return 'csv'
+    if ext == '' or os.path.isdir(path):
+        return 'npy'
+    raise ValueError(f'unsupported file format: {path}')
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError('Parquet support needs pyarrow: pip install pyarrow') from None
+    return pyarrow
+
+
+# readers yield (chunk, total_rows) pairs, where chunk maps column names to 1-d arrays
+# and total_rows is None if it is not known in advance
+
+def _read_parquet(path, chunk_size):
+    pa = _import_pyarrow()
+    parquet_file = pa.parquet.ParquetFile(path)
+    total = parquet_file.metadata.num_rows
+    for batch in parquet_file.iter_batches(batch_size=chunk_size):
+        yield {name: batch.column(name).to_numpy(zero_copy_only=False) for name in batch.schema.names}, total
+
+
+def _read_csv(path, chunk_size):
+    import pandas as pd
+    for df in pd.read_csv(path, chunksize=chunk_size):
+        yield {name: df[name].to_numpy() for name in df.columns}, None
+
+
+def _read_npy(path, chunk_size):
+    columns = {os.path.splitext(name)[0]: np.load(os.path.join(path, name), mmap_mode='r')
+               for name in sorted(os.listdir(path)) if name.endswith('.npy')}
+    total = len(next(iter(columns.values())))
+    for start in range(0, total, chunk_size):
+        yield {name: np.asarray(col[start:start + chunk_size]) for name, col in columns.items()}, total
+
+
+READERS = {'parquet': _read_parquet, 'csv': _read_csv, 'npy': _read_npy}
+
+
+class _ParquetWriter:
+    def __init__(self, path, total_rows):
+        self.pa = _import_pyarrow()
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        table = self.pa.table(chunk)
+        if self.writer is None:
+            self.writer = self.pa.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class _CsvWriter:
+    def __init__(self, path, total_rows):
+        self.path = path
+        self.header = True
+
+    def write(self, chunk):
+        import pandas as pd
+        pd.DataFrame(chunk).to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class _NpyWriter:
+    def __init__(self, path, total_rows):
+        if total_rows is None:
+            raise ValueError('a .npy output directory needs a Parquet or .npy input with a known row count')
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.total_rows = total_rows
+        self.columns = None
+        self.offset = 0
+
+    def write(self, chunk):
+        if self.columns is None:
+            self.columns = {name: np.lib.format.open_memmap(os.path.join(self.path, name + '.npy'), mode='w+',
+                                                            dtype=values.dtype, shape=(self.total_rows,))
+                            for name, values in chunk.items()}
+        n = len(next(iter(chunk.values())))
+        for name, values in chunk.items():
+            column = self.columns[name]
+            values = np.asarray(values)
+            if not np.can_cast(values.dtype, column.dtype):
+                raise ValueError(f'column {name!r} changed from {column.dtype} in the first chunk to {values.dtype}')
+            column[self.offset:self.offset + n] = values
+        self.offset += n
+
+    def close(self):
+        for column in (self.columns or {}).values():
+            column.flush()
+
+
+WRITERS = {'parquet': _ParquetWriter, 'csv': _CsvWriter, 'npy': _NpyWriter}
+
+
+def price_chunk(chunk, iv_method='newton', workers=None):
+    '''
+    Prices one chunk of positions. Returns the input columns extended with the price and Greeks of each
+    contract and, if the chunk has a mkt_price column, its implied volatility. workers is passed on to the
+    batch kernels to spread the chunk over several processes.
+    '''
+    missing = [name for name in INPUT_COLUMNS if name not in chunk]
+    if missing:
+        raise KeyError(f'missing input columns: {", ".join(missing)}')
+    numeric = {name: np.asarray(chunk[name], dtype=float) for name in INPUT_COLUMNS + ['mkt_price'] if name in chunk}
+    S0, K, T, r, sigma = (numeric[name] for name in INPUT_COLUMNS)
+    option_type = np.asarray(chunk.get('option_type', 'Call')).astype(str)
+    invalid = ~np.isin(option_type, ['Call', 'Put'])
+    if invalid.any():
+        raise ValueError(f"option_type must be 'Call' or 'Put', got {str(option_type[invalid][0])!r} "
+                         f'in {np.count_nonzero(invalid)} rows of the chunk')
+    is_call = _is_call(option_type)
+
+    greeks = BSModel(S0, K, T, r, sigma).greeks(workers)
+    out = dict(chunk)
+    # float64 in every chunk, whatever dtype the reader inferred for this one (e.g. integer strikes in a CSV)
+    out.update(numeric)
+    if 'option_type' in chunk:
+        # the same fixed width in every chunk, so .npy outputs can memory-map them
+        out['option_type'] = option_type.astype('<U4')
+    out['price'] = np.where(is_call, greeks.call, greeks.put)
+    out['delta'] = np.where(is_call, greeks.call_delta, greeks.put_delta)
+    out['gamma'] = greeks.gamma
+    out['theta'] = np.where(is_call, greeks.call_theta, greeks.put_theta)
+    out['vega'] = greeks.vega
+    out['rho'] = np.where(is_call, greeks.call_rho, greeks.put_rho)
+    out['vanna'] = greeks.vanna
+    out['volga'] = greeks.volga
+    for name in GREEK_COLUMNS:
+        out[name] = np.broadcast_to(out[name], S0.shape)
+
+    if 'mkt_price' in chunk:
+        iv = ImpliedVol.implied_vol_batch(S0, K, T, r, numeric['mkt_price'], option_type, method=iv_method,
+                                          workers=workers)
+        out['implied_vol'] = iv.vol
+        out['iv_converged'] = iv.converged
+    return out
+
+
+def price_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, iv_method='newton', workers=None):
+    '''
+    Streams input_path through price_chunk and writes the results to output_path.
+    Returns the number of rows processed.
+    '''
+    writer = None
+    rows = 0
+    try:
+        for chunk, total_rows in READERS[_file_format(input_path)](input_path, chunk_size):
+            if writer is None:
+                writer = WRITERS[_file_format(output_path)](output_path, total_rows)
+            writer.write(price_chunk(chunk, iv_method, workers))
+            rows += len(chunk['S0'])
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bspricer', description='Black-Scholes batch pricing of position files.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    price = subparsers.add_parser('price', help='price a Parquet, CSV or .npy-directory position file')
+    price.add_argument('input', help='input file (.parquet, .csv) or directory of .npy columns')
+    price.add_argument('-o', '--output', required=True, help='output file (.parquet, .csv) or .npy directory')
+    price.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='rows per chunk')
+    price.add_argument('--iv-method', choices=['newton', 'rational', 'grid'], default='newton',
+                       help='implied volatility solver used when the input has a mkt_price column')
+    price.add_argument('--workers', type=int, default=None,
+                       help='worker processes per chunk (0 for every CPU); by default everything runs in-process')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    rows = price_file(args.input, args.output, args.chunk_size, args.iv_method, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f'priced {rows:,} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
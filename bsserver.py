@@ -0,0 +1,310 @@
+'''
+Local HTTP/JSON pricing service around BSModel and ImpliedVol, with micro-batching of concurrent requests.
+
+    python -m bsserver --port 8787 --window-us 300
+
+Endpoints:
+    POST /price   S0, K, T, r, sigma and optionally option_type ('Call'/'Put', defaults to 'Call')
+                  -> price, delta, gamma, theta, vega, rho, vanna, volga
+    POST /iv      S0, K, T, r, mkt_price and optionally option_type -> implied_vol, converged
+    GET  /health  -> status and batching statistics
+
+Request bodies are JSON objects, or msgpack maps when sent with Content-Type application/msgpack (needs msgpack);
+the response uses the same encoding. Every field may be a number or a list (a small chain), and the response
+mirrors the request: scalars in, scalars out. Values that are not defined (e.g. the implied volatility of a quote
+outside the no-arbitrage bounds) are returned as null.
+
+Requests that arrive within the batching window are concatenated, priced as one vectorized batch and the results
+are fanned back out to each request, so the per-request Python overhead of the pricing call is shared and
+throughput grows with load instead of being capped by it. A batch is also cut as soon as max_rows contracts are
+pending. Everything runs on one event loop; set the window to 0 to price each request on its own.
+'''
+
+import argparse
+import asyncio
+import json
+import math
+from functools import partial
+
+import numpy as np
+
+from BSModel import ImpliedVol
+from bspricer import GREEK_COLUMNS, price_chunk
+
+DEFAULT_PORT = 8787
+DEFAULT_WINDOW = 300e-6
+DEFAULT_MAX_ROWS = 65536
+
+PRICE_COLUMNS = ['S0', 'K', 'T', 'r', 'sigma']
+IV_COLUMNS = ['S0', 'K', 'T', 'r', 'mkt_price']
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class RequestError(ValueError):
+    '''
+    A malformed request; reported to the client as a 400 response.
+    '''
+
+
+def _import_msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RequestError('msgpack bodies need msgpack installed on the server: pip install msgpack') from None
+    return msgpack
+
+
+def _parse_columns(body, columns):
+    '''
+    Validates a request body and turns it into equal-length 1-d columns (the numeric ones as float arrays,
+    option_type as a string array). Returns the columns, the row count and whether the request was all scalars.
+    '''
+    if not isinstance(body, dict):
+        raise RequestError('the request body must be an object')
+    missing = [name for name in columns if name not in body]
+    if missing:
+        raise RequestError(f'missing fields: {", ".join(missing)}')
+    try:
+        values = [np.asarray(body[name], dtype=float) for name in columns]
+    except (TypeError, ValueError):
+        raise RequestError(f'{", ".join(columns)} must be numbers or lists of numbers') from None
+    option_type = np.asarray(body.get('option_type', 'Call'))
+    if not np.isin(option_type, ['Call', 'Put']).all():
+        raise RequestError("option_type must be 'Call' or 'Put'")
+    try:
+        arrays = np.broadcast_arrays(*values, option_type)
+    except ValueError:
+        raise RequestError('list fields must all have the same length') from None
+    if arrays[0].ndim > 1:
+        raise RequestError('fields must be numbers or flat lists')
+    scalar = arrays[0].ndim == 0
+    parsed = {name: np.atleast_1d(a).astype(float) for name, a in zip(columns, arrays)}
+    parsed['option_type'] = np.atleast_1d(arrays[-1]).astype(str)
+    return parsed, parsed[columns[0]].size, scalar
+
+
+def _to_python(values, scalar):
+    values = np.asarray(values)
+    out = values.tolist()
+    if values.dtype.kind == 'f':
+        out = [x if math.isfinite(x) else None for x in out]
+    return out[0] if scalar else out
+
+
+def _price_batch(batch):
+    out = price_chunk(batch)
+    return {name: out[name] for name in GREEK_COLUMNS}
+
+
+def _iv_batch(batch, method='newton'):
+    iv = ImpliedVol.implied_vol_batch(batch['S0'], batch['K'], batch['T'], batch['r'], batch['mkt_price'],
+                                      batch['option_type'], method=method)
+    return {'implied_vol': iv.vol, 'converged': iv.converged}
+
+
+class MicroBatcher:
+    '''
+    This class collects the requests submitted within a short window, runs one vectorized batch function over
+    their concatenated columns and resolves each request with its own slice of the result.
+
+    func: maps a dict of 1-d column arrays to a dict of 1-d result arrays of the same length
+    window: how long (in seconds) the first request of a batch waits for others to join it (0 to run every
+            request as soon as it is submitted)
+    max_rows: the batch is run as soon as this many rows are pending
+    '''
+
+    def __init__(self, func, window=DEFAULT_WINDOW, max_rows=DEFAULT_MAX_ROWS):
+        self.func = func
+        self.window = window
+        self.max_rows = max_rows
+        self._pending = []
+        self._rows = 0
+        self._timer = None
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+
+    def submit(self, columns, n):
+        '''
+        Queues one request's columns (n rows each) and returns a future for its dict of result arrays.
+        '''
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((columns, n, future))
+        self._rows += n
+        if self._rows >= self.max_rows or self.window <= 0:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        '''
+        Runs the batch function over everything pending.
+        '''
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending, self._rows = self._pending, [], 0
+        if not pending:
+            return
+        try:
+            batch = {name: np.concatenate([columns[name] for columns, n, future in pending])
+                     for name in pending[0][0]}
+            result = self.func(batch)
+        except Exception as exc:
+            for columns, n, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        start = 0
+        for columns, n, future in pending:
+            # the client may have disconnected and cancelled its future in the meantime
+            if not future.done():
+                future.set_result({name: values[start:start + n] for name, values in result.items()})
+            start += n
+        self.batches += 1
+        self.requests += len(pending)
+        self.rows += start
+
+
+class PricingServer:
+    '''
+    This class serves the /price and /iv endpoints over HTTP/1.1 (with keep-alive) on an asyncio event loop,
+    micro-batching concurrent requests per endpoint.
+
+    host, port: the address to listen on (port 0 picks a free port, see self.port once started)
+    window: the batching window in seconds
+    max_rows: the largest batch, in contracts
+    iv_method: the ImpliedVol.implied_vol_batch backend used by /iv
+    '''
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, window=DEFAULT_WINDOW, max_rows=DEFAULT_MAX_ROWS,
+                 iv_method='newton'):
+        self.host = host
+        self.port = port
+        self._server = None
+        self.routes = {
+            '/price': (PRICE_COLUMNS, MicroBatcher(_price_batch, window, max_rows)),
+            '/iv': (IV_COLUMNS, MicroBatcher(partial(_iv_batch, method=iv_method), window, max_rows)),
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def stats(self):
+        stats = {}
+        for path, (columns, batcher) in self.routes.items():
+            stats[path] = {'requests': batcher.requests, 'batches': batcher.batches, 'rows': batcher.rows,
+                           'mean_batch_requests': batcher.requests / max(batcher.batches, 1)}
+        return stats
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    body = await reader.readexactly(int(headers.get('content-length', 0)))
+                except ValueError:
+                    self._respond(writer, 400, {'error': 'malformed HTTP request'}, 'application/json', False)
+                    break
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                content_type = headers.get('content-type', 'application/json').split(';')[0].strip()
+                if content_type != 'application/msgpack':
+                    content_type = 'application/json'
+                status, payload = await self._dispatch(method, path.split('?')[0], body, content_type)
+                self._respond(writer, status, payload, content_type, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method, path, body, content_type):
+        if path == '/health':
+            return 200, {'status': 'ok', 'stats': self.stats()}
+        if path not in self.routes:
+            return 404, {'error': f'unknown path {path}'}
+        if method != 'POST':
+            return 405, {'error': f'{path} only accepts POST'}
+        columns, batcher = self.routes[path]
+        try:
+            if content_type == 'application/msgpack':
+                request = _import_msgpack().unpackb(body)
+            else:
+                request = json.loads(body)
+            parsed, n, scalar = _parse_columns(request, columns)
+        except RequestError as exc:
+            return 400, {'error': str(exc)}
+        except ValueError:
+            return 400, {'error': 'the request body is not valid ' + content_type.split('/')[1]}
+        try:
+            result = await batcher.submit(parsed, n)
+        except Exception as exc:
+            return 500, {'error': f'{type(exc).__name__}: {exc}'}
+        return 200, {name: _to_python(values, scalar) for name, values in result.items()}
+
+    @staticmethod
+    def _respond(writer, status, payload, content_type, keep_alive):
+        if content_type == 'application/msgpack':
+            try:
+                body = _import_msgpack().packb(payload)
+            except RequestError:
+                body, content_type = json.dumps(payload).encode(), 'application/json'
+        else:
+            body = json.dumps(payload).encode()
+        head = (f'HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + body)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bsserver', description='Black-Scholes pricing service with micro-batching.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--window-us', type=float, default=DEFAULT_WINDOW * 1e6,
+                        help='how long a request waits for others to batch with, in microseconds')
+    parser.add_argument('--max-rows', type=int, default=DEFAULT_MAX_ROWS, help='largest batch, in contracts')
+    parser.add_argument('--iv-method', choices=['newton', 'rational', 'grid'], default='newton',
+                        help='implied volatility solver used by /iv')
+    args = parser.parse_args(argv)
+
+    server = PricingServer(args.host, args.port, args.window_us * 1e-6, args.max_rows, args.iv_method)
+
+    async def serve():
+        await server.start()
+        print(f'serving on http://{server.host}:{server.port}', flush=True)
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
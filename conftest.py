@@ -0,0 +1,17 @@
+'''
+Shared pytest fixtures.
+'''
+
+import pytest
+
+import IVGrid
+
+
+@pytest.fixture(autouse=True)
+def grid_cache(tmp_path, monkeypatch):
+    '''
+    Builds the IV grid cache of each test under its tmp_path instead of the user's ~/.cache/bspricer, with a
+    fresh default_grid().
+    '''
+    monkeypatch.setenv('BSPRICER_CACHE', str(tmp_path / 'bspricer'))
+    monkeypatch.setattr(IVGrid, '_default_grid', None)
@@ -1,9 +1,12 @@
+from contextlib import nullcontext
+
 import streamlit as st
 import numpy as np
 import pandas as pd
 
 # import local modules
 from BSModel import BSModel, ImpliedVol
+import BSProfile
 
 st.set_page_config(
     page_title="BS Option Pricer",
@@ -49,128 +52,118 @@ option_type = st.sidebar.selectbox(label = "Option Type", options = ['Call', 'Pu
 mkt_price = st.sidebar.number_input(label = "Option Market Price", min_value = 0.00, max_value = None, value = 5.00, step = 0.01)
 initial_guess = st.sidebar.number_input(label = "Initial Guess for Implied Volatility (%)", min_value = 0.00, max_value = None, value = 20.00, step = 0.01) / 100
 
-# calculate the price
-bs = BSModel(S0, K, T, r, sigma)
-call_price = bs.bs_call()
-put_price = bs.bs_put()
-
-# data for the graph
-df_spot = pd.DataFrame({'spot_price': np.linspace(S_min, S_max, 100),
-'call': np.array([BSModel(s0, K, T, r, sigma).bs_call() for s0 in np.linspace(S_min, S_max, 100)]),
-'put': np.array([BSModel(s0, K, T, r, sigma).bs_put() for s0 in np.linspace(S_min, S_max, 100)])})
-
-df_vol = pd.DataFrame({'volatility': np.linspace(vol_min, vol_max, 100),
-'call': np.array([BSModel(S0, K, T, r, vol).bs_call() for vol in np.linspace(vol_min, vol_max, 100)]),
-'put': np.array([BSModel(S0, K, T, r, vol).bs_put() for vol in np.linspace(vol_min, vol_max, 100)])})
-
-df_time = pd.DataFrame({'time': np.linspace(0, T, 100),
-'call': np.array([BSModel(S0, K, t, r, sigma).bs_call() for t in np.linspace(0, T, 100)]),
-'put': np.array([BSModel(S0, K, t, r, sigma).bs_put() for t in np.linspace(0, T, 100)])})
-
-# calcualte the implied volatility
-implied_vol = ImpliedVol(S0, K, T, r, mkt_price, option_type, initial_guess)
-imp_vol = implied_vol.implied_vol()
-
-
-# calculate the greeks
-bs_imp = BSModel(S0, K, T, r, sigma)
-
-call_delta = bs_imp.bs_call_delta()
-put_delta = bs_imp.bs_put_delta()
-df_call_delta = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_call_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_call_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_call_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_call_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_call_delta() for s0 in np.linspace(S_min, S_max, 100)])
-})
-df_put_delta = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_put_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_put_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_put_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_put_delta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_put_delta() for s0 in np.linspace(S_min, S_max, 100)])
-})
-
-gamma = bs_imp.bs_gamma()
-df_gamma = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_gamma() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_gamma() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_gamma() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_gamma() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_gamma() for s0 in np.linspace(S_min, S_max, 100)])
-})
-
-call_theta = bs_imp.bs_call_theta()
-put_theta = bs_imp.bs_put_theta()
-df_call_theta = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_call_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_call_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_call_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_call_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_call_theta() for s0 in np.linspace(S_min, S_max, 100)])
-})
-df_put_theta = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_put_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_put_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_put_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_put_theta() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_put_theta() for s0 in np.linspace(S_min, S_max, 100)])                       
-})
-
-vega = bs_imp.bs_vega()
-df_vega = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_vega() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_vega() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_vega() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_vega() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_vega() for s0 in np.linspace(S_min, S_max, 100)])
-})
-
-call_rho = bs_imp.bs_call_rho()
-put_rho = bs_imp.bs_put_rho()
-df_call_rho = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_call_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_call_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_call_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_call_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_call_rho() for s0 in np.linspace(S_min, S_max, 100)])
-})
-df_put_rho = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_put_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_put_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_put_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_put_rho() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_put_rho() for s0 in np.linspace(S_min, S_max, 100)])
-})
-
-vanna = bs_imp.bs_vanna()
-df_vanna = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_vanna() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_vanna() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_vanna() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_vanna() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_vanna() for s0 in np.linspace(S_min, S_max, 100)])
-})
-
-volga = bs_imp.bs_volga()
-df_volga = pd.DataFrame({
-    'Spot': np.linspace(S_min, S_max, 100),
-    'vol=10%': np.array([BSModel(s0, K, T, r, 0.1).bs_volga() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=30%': np.array([BSModel(s0, K, T, r, 0.3).bs_volga() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=50%': np.array([BSModel(s0, K, T, r, 0.5).bs_volga() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=80%': np.array([BSModel(s0, K, T, r, 0.8).bs_volga() for s0 in np.linspace(S_min, S_max, 100)]),
-    'vol=100%': np.array([BSModel(s0, K, T, r, 1.0).bs_volga() for s0 in np.linspace(S_min, S_max, 100)])
-})
+st.sidebar.divider()
+
+st.sidebar.header('Diagnostics')
+show_timings = st.sidebar.toggle(label = "Show Timings", value = False)
+
+# Chart data only depends on the pricing and graphical parameters, so it is computed by cached functions:
+# reruns triggered by the implied volatility inputs, or repeating a parameter set, skip the recomputation.
+# max_entries bounds the memory held by the cache on the shared deployment.
+CACHE_ENTRIES = 64
+LADDER_VOLS = np.array([0.1, 0.3, 0.5, 0.8, 1.0])
+
+
+@st.cache_data(max_entries = CACHE_ENTRIES)
+def price_data(S0, K, T, r, sigma, S_min, S_max, vol_min, vol_max):
+    spot_grid = np.linspace(S_min, S_max, 100)
+    df_spot = pd.DataFrame({'spot_price': spot_grid,
+    'call': BSModel.price_batch(spot_grid, K, T, r, sigma, 'Call'),
+    'put': BSModel.price_batch(spot_grid, K, T, r, sigma, 'Put')})
+
+    vol_grid = np.linspace(vol_min, vol_max, 100)
+    df_vol = pd.DataFrame({'volatility': vol_grid,
+    'call': BSModel.price_batch(S0, K, T, r, vol_grid, 'Call'),
+    'put': BSModel.price_batch(S0, K, T, r, vol_grid, 'Put')})
+
+    time_grid = np.linspace(0, T, 100)
+    df_time = pd.DataFrame({'time': time_grid,
+    'call': BSModel.price_batch(S0, K, time_grid, r, sigma, 'Call'),
+    'put': BSModel.price_batch(S0, K, time_grid, r, sigma, 'Put')})
+
+    return df_spot, df_vol, df_time
+
+
+@st.cache_data(max_entries = CACHE_ENTRIES)
+def greek_data(S0, K, T, r, sigma, S_min, S_max):
+    greeks = BSModel(S0, K, T, r, sigma).greeks()
+
+    # Greeks vs. spot for a ladder of volatilities, evaluated in a single broadcast pass (spot along rows, vol along columns)
+    spot_grid = np.linspace(S_min, S_max, 100)
+    greeks_ladder = BSModel(spot_grid[:, None], K, T, r, LADDER_VOLS[None, :]).greeks()
+    ladder_cols = [f'vol={v:.0%}' for v in LADDER_VOLS]
+
+    df_ladder = {}
+    for name in greeks_ladder._fields:
+        df = pd.DataFrame(getattr(greeks_ladder, name), columns = ladder_cols)
+        df.insert(0, 'Spot', spot_grid)
+        df_ladder[name] = df
+
+    return greeks, df_ladder
+
+
+# the calculations run under a profile when the timings are shown (the cached stages time the cache lookup on a hit)
+with BSProfile.profile() if show_timings else nullcontext() as prof:
+    # calculate the price
+    with BSProfile.stage('prices'):
+        call_price, put_price = BSModel.price_batch(S0, K, T, r, sigma, np.array(['Call', 'Put']))
+
+    # data for the graph
+    with BSProfile.stage('price_data'):
+        df_spot, df_vol, df_time = price_data(S0, K, T, r, sigma, S_min, S_max, vol_min, vol_max)
+
+    # calcualte the implied volatility
+    with BSProfile.stage('implied_vol'):
+        implied_vol = ImpliedVol(S0, K, T, r, mkt_price, option_type, initial_guess)
+        imp_vol = implied_vol.implied_vol()
+
+    # calculate the greeks
+    with BSProfile.stage('greek_data'):
+        greeks, df_ladder = greek_data(S0, K, T, r, sigma, S_min, S_max)
+
+if show_timings:
+    metrics = prof.to_dict()
+    stages = metrics.get('bspricer_stage_seconds', {}).get('samples', [])
+    st.sidebar.write('**Stage Wall Time**')
+    st.sidebar.dataframe(pd.DataFrame({
+        'Stage': [sample['labels']['stage'] for sample in stages],
+        'ms': [sample['sum'] * 1e3 for sample in stages]
+    }).set_index('Stage'), use_container_width = True)
+
+    calls = {sample['labels']['function']: sample['value'] for sample in metrics.get('bspricer_calls_total', {}).get('samples', [])}
+    call_ms = {sample['labels']['function']: sample['sum'] * 1e3 for sample in metrics.get('bspricer_call_seconds', {}).get('samples', [])}
+    if calls:
+        st.sidebar.write('**Instrumented Calls**')
+        st.sidebar.dataframe(pd.DataFrame({'Function': list(calls), 'Calls': list(calls.values()),
+                                           'ms': [call_ms[name] for name in calls]}).set_index('Function'),
+                             use_container_width = True)
+
+    iterations = metrics.get('bspricer_iv_iterations', {}).get('samples', [])
+    if iterations:
+        st.sidebar.write(f'**Implied Volatility Iterations:** {iterations[0]["sum"]:.0f}')
+    if 'bspricer_iv_unconverged_total' in metrics:
+        st.sidebar.warning('The implied volatility solver did not converge.')
+    with st.sidebar.expander('Prometheus Metrics'):
+        st.code(prof.to_prometheus(), language = None)
+
+call_delta, put_delta = greeks.call_delta, greeks.put_delta
+gamma = greeks.gamma
+call_theta, put_theta = greeks.call_theta, greeks.put_theta
+vega = greeks.vega
+call_rho, put_rho = greeks.call_rho, greeks.put_rho
+vanna = greeks.vanna
+volga = greeks.volga
+
+df_call_delta = df_ladder['call_delta']
+df_put_delta = df_ladder['put_delta']
+df_gamma = df_ladder['gamma']
+df_call_theta = df_ladder['call_theta']
+df_put_theta = df_ladder['put_theta']
+df_vega = df_ladder['vega']
+df_call_rho = df_ladder['call_rho']
+df_put_rho = df_ladder['put_rho']
+df_vanna = df_ladder['vanna']
+df_volga = df_ladder['volga']
 
 
 # display the results
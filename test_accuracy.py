@@ -0,0 +1,16 @@
+'''
+Runs the accuracy checks of benchmark.py under pytest. benchmark.py stays the place for the timings and the
+JSON baselines; every check it reports has to pass here.
+'''
+
+import pytest
+
+import benchmark
+
+
+# the scalar Newton solves at the degenerate corners of the checks warn by design
+@pytest.mark.filterwarnings('ignore::RuntimeWarning')
+def test_accuracy_checks_pass():
+    results = benchmark.run_accuracy()
+    failed = {name: stats for name, stats in results.items() if not stats['passed']}
+    assert not failed, failed
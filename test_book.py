@@ -0,0 +1,59 @@
+'''
+Tests of the incremental book against BSModel.greeks().
+'''
+
+import numpy as np
+
+from BSBook import BSBook, BookGreeks
+from BSModel import BSModel
+
+
+def expected(S0, K, T, r, sigma, option_type):
+    g = BSModel(S0, K, T, r, sigma).greeks()
+    is_call = option_type == 'Call'
+    return BookGreeks(np.where(is_call, g.call, g.put), np.where(is_call, g.call_delta, g.put_delta), g.gamma,
+                      np.where(is_call, g.call_theta, g.put_theta), g.vega, np.where(is_call, g.call_rho, g.put_rho),
+                      g.vanna, g.volga)
+
+
+def assert_matches(book, S0, K, T, r, sigma, option_type):
+    for name, value, reference in zip(BookGreeks._fields, book.snapshot(), expected(S0, K, T, r, sigma, option_type)):
+        np.testing.assert_allclose(value, reference, rtol=1e-12, atol=1e-12, err_msg=name)
+
+
+def test_ticks_on_a_multi_underlying_book():
+    rng = np.random.default_rng(0)
+    n = 60
+    # interleaved underlyings, so the stored order differs from the contract order
+    underlying = np.array([7, 3, 5])[np.arange(n) % 3]
+    spots = {7: 100.0, 3: 40.0, 5: 250.0}
+    S0 = np.array([spots[u] for u in underlying])
+    K = S0 * rng.uniform(0.7, 1.3, n)
+    T = rng.uniform(0.05, 2.0, n)
+    r = rng.uniform(0.0, 0.05, n)
+    sigma = rng.uniform(0.1, 0.6, n)
+    option_type = np.where(rng.random(n) < 0.5, 'Call', 'Put')
+    book = BSBook(S0, K, T, r, sigma, option_type, underlying)
+    assert_matches(book, S0, K, T, r, sigma, option_type)
+
+    book.update_spot(3, 42.5)
+    S0 = np.where(underlying == 3, 42.5, S0)
+    assert_matches(book, S0, K, T, r, sigma, option_type)
+
+    # one vol per contract of the book, in contract order: only underlying 7's are used
+    new_sigma = rng.uniform(0.1, 0.6, n)
+    book.update_sigma(7, new_sigma)
+    sigma = np.where(underlying == 7, new_sigma, sigma)
+    assert_matches(book, S0, K, T, r, sigma, option_type)
+
+    # one vol per contract of underlying 5, in their contract order
+    on_5 = underlying == 5
+    sigma[on_5] = np.linspace(0.15, 0.45, on_5.sum())
+    book.update_sigma(5, sigma[on_5])
+    book.update_spot(5, 240.0)
+    S0 = np.where(on_5, 240.0, S0)
+    assert_matches(book, S0, K, T, r, sigma, option_type)
+
+    book.update_sigma(3, 0.3)
+    sigma = np.where(underlying == 3, 0.3, sigma)
+    assert_matches(book, S0, K, T, r, sigma, option_type)
@@ -0,0 +1,61 @@
+'''
+Tests of the batch pricing CLI.
+'''
+
+import numpy as np
+import pytest
+
+import bspricer
+
+
+def positions(option_type):
+    n = len(option_type)
+    return {'S0': np.full(n, 100.0), 'K': np.linspace(80.0, 120.0, n), 'T': np.full(n, 1.0),
+            'r': np.full(n, 0.05), 'sigma': np.full(n, 0.2), 'option_type': np.array(option_type)}
+
+
+def test_npy_output_keeps_call_when_the_first_chunk_is_all_puts(tmp_path):
+    writer = bspricer._NpyWriter(str(tmp_path), 4)
+    writer.write(bspricer.price_chunk(positions(['Put', 'Put'])))
+    writer.write(bspricer.price_chunk(positions(['Call', 'Call'])))
+    writer.close()
+    assert np.load(tmp_path / 'option_type.npy').tolist() == ['Put', 'Put', 'Call', 'Call']
+
+
+def test_npy_output_rejects_a_chunk_that_does_not_fit(tmp_path):
+    writer = bspricer._NpyWriter(str(tmp_path), 4)
+    writer.write({'quantity': np.array([1, 2])})
+    with pytest.raises(ValueError):
+        writer.write({'quantity': np.array([1.5, 2.5])})
+
+
+def write_csv(path, rows):
+    with open(path, 'w') as f:
+        f.write('S0,K,T,r,sigma,option_type,mkt_price\n')
+        for K, option_type in rows:
+            f.write(f'100,{K},1,0.05,0.2,{option_type},10\n')
+
+
+@pytest.mark.parametrize('suffix', ['.csv', '.parquet'])
+def test_csv_round_trip_with_integer_then_float_chunks(tmp_path, suffix):
+    if suffix == '.parquet':
+        pytest.importorskip('pyarrow')
+    pd = pytest.importorskip('pandas')
+    source, output = tmp_path / 'positions.csv', tmp_path / ('priced' + suffix)
+    # the reader infers int64 strikes for the first chunk and float64 for the second
+    write_csv(source, [(100, 'Put')] * 3 + [(100.5, 'Call')] * 3)
+    assert bspricer.price_file(str(source), str(output), chunk_size=3) == 6
+    priced = pd.read_csv(output) if suffix == '.csv' else pd.read_parquet(output)
+    assert priced['K'].tolist() == [100.0] * 3 + [100.5] * 3
+    assert priced['option_type'].tolist() == ['Put'] * 3 + ['Call'] * 3
+    expected = bspricer.price_chunk(positions(['Put'] * 3 + ['Call'] * 3) | {'K': priced['K'].to_numpy()})
+    np.testing.assert_allclose(priced['price'], expected['price'], rtol=1e-12)
+
+
+@pytest.mark.parametrize('option_type', ['', 'Cal', 'call'])
+def test_unknown_option_type_is_rejected(tmp_path, option_type):
+    pytest.importorskip('pandas')
+    source = tmp_path / 'positions.csv'
+    write_csv(source, [(100, 'Call'), (100, option_type)])
+    with pytest.raises(ValueError):
+        bspricer.price_file(str(source), str(tmp_path / 'priced.csv'))
@@ -0,0 +1,121 @@
+'''
+Tests of the micro-batching pricing service.
+'''
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from BSModel import BSModel
+from bsserver import MicroBatcher, PricingServer, RequestError, _parse_columns
+
+
+def double(batch):
+    return {'double': 2 * batch['x']}
+
+
+def test_requests_in_one_window_share_a_batch():
+    async def run():
+        batcher = MicroBatcher(double, window=0.05)
+        futures = [batcher.submit({'x': np.arange(n, dtype=float)}, n) for n in (1, 3, 2)]
+        return batcher, await asyncio.gather(*futures)
+
+    batcher, results = asyncio.run(run())
+    assert (batcher.batches, batcher.requests, batcher.rows) == (1, 3, 6)
+    for n, result in zip((1, 3, 2), results):
+        np.testing.assert_array_equal(result['double'], 2 * np.arange(n))
+
+
+def test_max_rows_flushes_before_the_window():
+    async def run():
+        batcher = MicroBatcher(double, window=60.0, max_rows=4)
+        first = batcher.submit({'x': np.array([1.0, 2.0])}, 2)
+        assert not first.done()
+        second = batcher.submit({'x': np.array([3.0, 4.0])}, 2)
+        # the batch ran on reaching max_rows, without waiting for the window
+        assert first.done() and second.done()
+        return batcher, first.result(), second.result()
+
+    batcher, first, second = asyncio.run(run())
+    assert batcher.batches == 1
+    np.testing.assert_array_equal(first['double'], [2.0, 4.0])
+    np.testing.assert_array_equal(second['double'], [6.0, 8.0])
+
+
+def test_zero_window_runs_every_request_on_its_own():
+    async def run():
+        batcher = MicroBatcher(double, window=0)
+        await asyncio.gather(*(batcher.submit({'x': np.ones(1)}, 1) for _ in range(3)))
+        return batcher
+
+    assert asyncio.run(run()).batches == 3
+
+
+@pytest.mark.parametrize('body', [
+    {'S0': [100, 101], 'K': [100, 100, 100], 'T': 1, 'r': 0.05, 'sigma': 0.2},
+    {'S0': 100, 'K': 100, 'T': 1, 'r': 0.05, 'sigma': 0.2, 'option_type': 'call'},
+    {'S0': 100, 'K': 100, 'T': 1, 'r': 0.05},
+    {'S0': 'a', 'K': 100, 'T': 1, 'r': 0.05, 'sigma': 0.2},
+    [100, 100, 1, 0.05, 0.2],
+])
+def test_parse_columns_rejects_malformed_bodies(body):
+    with pytest.raises(RequestError):
+        _parse_columns(body, ['S0', 'K', 'T', 'r', 'sigma'])
+
+
+@pytest.mark.parametrize('body', [
+    b'{"S0": 100, "K": ',
+    json.dumps({'S0': [100, 101], 'K': [100, 100, 100], 'T': 1, 'r': 0.05, 'sigma': 0.2}).encode(),
+    json.dumps({'S0': 100, 'K': 100, 'T': 1, 'r': 0.05, 'sigma': 0.2, 'option_type': 'Cal'}).encode(),
+])
+def test_bad_requests_get_400(body):
+    status, payload = asyncio.run(PricingServer()._dispatch('POST', '/price', body, 'application/json'))
+    assert status == 400
+    assert 'error' in payload
+
+
+async def post(port, path, payload):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode()
+    writer.write(f'POST {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + body)
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    response = json.loads(await reader.readexactly(length))
+    writer.close()
+    return status, response
+
+
+def test_price_and_iv_round_trip():
+    K = [90.0, 100.0, 110.0]
+
+    async def run():
+        server = PricingServer(port=0)
+        await server.start()
+        try:
+            priced = await post(server.port, '/price',
+                                {'S0': 100, 'K': K, 'T': 1, 'r': 0.05, 'sigma': 0.2, 'option_type': 'Put'})
+            implied = await post(server.port, '/iv',
+                                 {'S0': 100, 'K': K, 'T': 1, 'r': 0.05, 'mkt_price': priced[1]['price'],
+                                  'option_type': 'Put'})
+            scalar = await post(server.port, '/iv', {'S0': 100, 'K': 100, 'T': 1, 'r': 0.05, 'mkt_price': 200})
+        finally:
+            await server.close()
+        return priced, implied, scalar
+
+    (price_status, priced), (iv_status, implied), (scalar_status, scalar) = asyncio.run(run())
+    assert price_status == iv_status == scalar_status == 200
+    np.testing.assert_allclose(priced['price'], BSModel(100.0, np.array(K), 1.0, 0.05, 0.2).bs_put(), rtol=1e-12)
+    np.testing.assert_allclose(implied['implied_vol'], 0.2, rtol=1e-8)
+    assert implied['converged'] == [True] * 3
+    # a quote above the underlying has no implied volatility: null, and scalars in give scalars out
+    assert scalar == {'implied_vol': None, 'converged': False}
@@ -0,0 +1,51 @@
+'''
+Tests of the binomial-tree and Monte Carlo engines.
+'''
+
+import numpy as np
+import pytest
+
+from BSEngines import BinomialTree, MonteCarlo
+from BSModel import BSModel
+
+S0, K, T, R, SIGMA = 100.0, 100.0, 1.0, 0.05, 0.2
+
+
+def test_monte_carlo_antithetic_single_path_chunks():
+    mc = MonteCarlo(S0, K, T, R, SIGMA, paths=11, chunk_size=1, control_variate=False, seed=0).price()
+    assert mc.paths == 12
+
+
+def test_monte_carlo_default_european_is_an_independent_estimate():
+    mc = MonteCarlo(S0, K, T, R, SIGMA, paths=200_000, seed=0).price()
+    assert mc.stderr > 0
+    assert abs(mc.price - BSModel(S0, K, T, R, SIGMA).bs_call()) < 4 * mc.stderr
+
+
+def test_monte_carlo_control_variate_defaults_on_for_custom_payoffs():
+    def asian(S):
+        return np.maximum(S.mean(axis=1) - K, 0.0)
+
+    default = MonteCarlo(S0, K, T, R, SIGMA, payoff=asian, steps=12, paths=100_000, seed=0).price()
+    plain = MonteCarlo(S0, K, T, R, SIGMA, payoff=asian, steps=12, paths=100_000, control_variate=False,
+                       seed=0).price()
+    assert default.stderr < plain.stderr
+
+
+@pytest.mark.parametrize('kwargs', [{'chunk_size': 0}, {'paths': 0}])
+def test_monte_carlo_rejects_empty_runs(kwargs):
+    with pytest.raises(ValueError):
+        MonteCarlo(S0, K, T, R, SIGMA, **kwargs)
+
+
+@pytest.mark.parametrize('method, steps', [('crr', 1), ('crr', 2), ('leisen-reimer', 1)])
+def test_binomial_tree_rejects_too_few_steps(method, steps):
+    with pytest.raises(ValueError):
+        BinomialTree(S0, K, T, R, SIGMA, steps=steps, method=method)
+
+
+@pytest.mark.parametrize('method', ['crr', 'leisen-reimer'])
+def test_binomial_tree_smallest_tree(method):
+    tree = BinomialTree(S0, K, T, R, SIGMA, steps=3, method=method).price()
+    assert tree.steps == 3
+    assert 0 < tree.delta < 1
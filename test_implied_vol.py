@@ -0,0 +1,112 @@
+'''
+Accuracy tests of the implied volatility backends: the rational backend against the generating volatility and
+against the Newton solver, across moneyness and maturity.
+'''
+
+import numpy as np
+import pytest
+
+from BSModel import BSModel, ImpliedVol
+from IVGrid import IVGrid
+
+S0, R = 100.0, 0.03
+
+
+def quote_grid():
+    '''
+    Out-of-the-money quotes on a moneyness x maturity x volatility grid, from deep out of the money to near the
+    money and from one day to five years, priced with BSModel. The log-moneyness is sampled finely within 0.1 of
+    the money, where short-dated quotes have their root just below the inflection point.
+    '''
+    log_moneyness = np.union1d(np.linspace(-1.5, 1.5, 31), np.linspace(-0.1, 0.1, 41))
+    moneyness, T, sigma = (x.ravel() for x in np.meshgrid(np.exp(log_moneyness),
+                                                            [1 / 365, 0.0127, 1 / 52, 0.05, 0.25, 1.0, 5.0],
+                                                            [0.05, 0.11, 0.2, 0.6, 1.5], indexing='ij'))
+    K = S0 * moneyness
+    option_type = np.where(K >= S0, 'Call', 'Put')
+    price = BSModel.price_batch(S0, K, T, R, sigma, option_type)
+    vega = BSModel(S0, K, T, R, sigma).greeks().vega
+    return K, T, sigma, option_type, price, vega
+
+
+def test_rational_recovers_generating_vol():
+    K, T, sigma, option_type, price, vega = quote_grid()
+    # quotes whose price is representable well above underflow carry the volatility to full precision
+    priced = price > 1e-250
+    iv = ImpliedVol.implied_vol_batch(S0, K, T, R, price, option_type, method='rational')
+    assert iv.converged[priced].all()
+    np.testing.assert_allclose(iv.vol[priced], sigma[priced], rtol=1e-9)
+
+
+def test_rational_deep_out_of_the_money_and_short_dated():
+    # a 1-day 60% strike put and a 1-week 250% strike call: prices far below a cent
+    K = np.array([60.0, 250.0])
+    T = np.array([1 / 365, 1 / 52])
+    option_type = np.array(['Put', 'Call'])
+    price = BSModel.price_batch(S0, K, T, R, 0.5, option_type)
+    assert (price < 1e-10).all()
+    iv = ImpliedVol.implied_vol_batch(S0, K, T, R, price, option_type, method='rational')
+    np.testing.assert_allclose(iv.vol, 0.5, rtol=1e-9)
+
+
+def test_short_dated_near_the_money():
+    # the root sits far below the inflection point's closed-form guesses; it used to come back as 0.0032
+    price = BSModel.price_batch(S0, 98.0, 0.0127, R, 0.11, 'Put')
+    for method in ('rational', 'grid'):
+        iv = ImpliedVol.implied_vol_batch(S0, 98.0, 0.0127, R, price, 'Put', method=method)
+        assert iv.converged
+        assert iv.vol == pytest.approx(0.11, rel=1e-9)
+
+
+@pytest.mark.parametrize('method', ['rational', 'grid'])
+def test_converged_quotes_reprice(method):
+    rng = np.random.default_rng(0)
+    K = S0 * np.exp(rng.uniform(-0.1, 0.1, 20_000))
+    T = rng.uniform(1 / 365, 0.1, K.size)
+    sigma = rng.uniform(0.03, 1.0, K.size)
+    option_type = np.where(rng.random(K.size) < 0.5, 'Call', 'Put')
+    price = BSModel.price_batch(S0, K, T, R, sigma, option_type)
+    meaningful = BSModel(S0, K, T, R, sigma).greeks().vega > 1e-2
+    iv = ImpliedVol.implied_vol_batch(S0, K, T, R, price, option_type, method=method)
+    assert iv.converged[meaningful].all()
+    np.testing.assert_allclose(iv.vol[meaningful], sigma[meaningful], rtol=1e-8)
+
+
+def test_rational_matches_newton():
+    K, T, sigma, option_type, price, vega = quote_grid()
+    # Newton stops at a price tolerance, so compare where the vega turns that into a small vol error
+    meaningful = vega > 1e-2
+    rational = ImpliedVol.implied_vol_batch(S0, K, T, R, price, option_type, method='rational')
+    newton = ImpliedVol.implied_vol_batch(S0, K, T, R, price, option_type, method='newton')
+    assert newton.converged[meaningful].all()
+    np.testing.assert_allclose(rational.vol[meaningful], newton.vol[meaningful], atol=1e-7)
+
+
+@pytest.mark.parametrize('method', ['newton', 'rational', 'grid'])
+def test_invalid_quotes_are_nan(method):
+    # below intrinsic value, above the underlying, zero, and expired
+    K = np.array([80.0, 100.0, 100.0, 100.0])
+    T = np.array([1.0, 1.0, 1.0, 0.0])
+    price = np.array([10.0, 150.0, 0.0, 5.0])
+    iv = ImpliedVol.implied_vol_batch(S0, K, T, R, price, 'Call', method=method)
+    assert np.isnan(iv.vol).all()
+    assert not iv.converged.any()
+
+
+def test_scalar_rational_matches_batch():
+    price = BSModel(S0, 110.0, 0.5, R, 0.3).bs_call()
+    vol = ImpliedVol(S0, 110.0, 0.5, R, price, 'Call', 0.2, method='rational').implied_vol()
+    assert vol == pytest.approx(0.3, rel=1e-12)
+
+
+def test_unknown_method_raises():
+    with pytest.raises(ValueError):
+        ImpliedVol(S0, 100.0, 1.0, R, 10.0, 'Call', 0.2, method='secant')
+
+
+def test_grid_falls_back_to_memory_when_the_cache_is_unwritable(tmp_path):
+    blocker = tmp_path / 'not_a_directory'
+    blocker.write_text('')
+    cached = IVGrid(n_x=32, n_z=64, cache_dir=str(tmp_path / 'cache'))
+    in_memory = IVGrid(n_x=32, n_z=64, cache_dir=str(blocker / 'cache'))
+    np.testing.assert_array_equal(in_memory.log_s, cached.log_s)
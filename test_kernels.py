@@ -0,0 +1,64 @@
+'''
+Tests of the compiled kernels against SciPy and the NumPy pricing formula. Skipped without numba.
+'''
+
+import numpy as np
+import pytest
+from scipy.special import ndtr
+from scipy.stats import norm
+
+import BSKernels
+from BSModel import _d1_d2
+
+pytestmark = pytest.mark.skipif(not BSKernels.HAS_NUMBA, reason='the compiled kernels need numba')
+
+
+def quotes(n=100_000, seed=0):
+    rng = np.random.default_rng(seed)
+    S0 = rng.uniform(1.0, 1000.0, n)
+    K = S0 * np.exp(rng.uniform(-2.0, 2.0, n))
+    T = np.exp(rng.uniform(np.log(1e-3), np.log(10.0), n))
+    r = rng.uniform(-0.02, 0.1, n)
+    sigma = rng.uniform(0.01, 2.0, n)
+    is_call = rng.random(n) < 0.5
+    return S0, K, T, r, sigma, is_call
+
+
+def numpy_price(S0, K, T, r, sigma, is_call):
+    # the NumPy path of BSModel._price, which it only takes without numba
+    d1, d2 = _d1_d2(S0, K, T, r, sigma)
+    theta = np.where(is_call, 1.0, -1.0)
+    return theta * (S0 * ndtr(theta * d1) - K * np.exp(-r * T) * ndtr(theta * d2))
+
+
+def test_norm_cdf_matches_ndtr():
+    # the far left tail, down to the smallest normal doubles, keeps its relative precision (up to the rounding
+    # of x / sqrt(2), amplified by x^2 / 2 in the exponent)
+    x = np.linspace(-37.5, 10.0, 200_001)
+    np.testing.assert_allclose(BSKernels.norm_cdf(x), ndtr(x), rtol=1e-12, atol=0)
+    assert BSKernels.norm_cdf(0.5) == pytest.approx(ndtr(0.5), rel=1e-15)
+
+
+def test_norm_pdf_matches_scipy():
+    x = np.linspace(-38.0, 38.0, 200_001)
+    np.testing.assert_allclose(BSKernels.norm_pdf(x), norm.pdf(x), rtol=1e-13, atol=0)
+
+
+def test_bs_price_matches_numpy_formula():
+    S0, K, T, r, sigma, is_call = quotes()
+    reference = numpy_price(S0, K, T, r, sigma, is_call)
+    np.testing.assert_allclose(BSKernels.bs_price(S0, K, T, r, sigma, is_call), reference, rtol=1e-9,
+                               atol=1e-12 * S0.max())
+
+
+def test_bs_price_broadcasts():
+    K = np.array([[90.0], [100.0], [110.0]])
+    price = BSKernels.bs_price(100.0, K, np.array([0.5, 1.0]), 0.05, 0.2, True)
+    assert price.shape == (3, 2)
+    np.testing.assert_allclose(price, numpy_price(100.0, K, np.array([0.5, 1.0]), 0.05, 0.2, True), rtol=1e-12)
+
+
+def test_bs_price_scalar_matches_ufunc():
+    S0, K, T, r, sigma, is_call = quotes(n=500, seed=1)
+    scalar = [BSKernels.bs_price_scalar(*quote) for quote in zip(S0, K, T, r, sigma, is_call)]
+    np.testing.assert_array_equal(scalar, BSKernels.bs_price(S0, K, T, r, sigma, is_call))
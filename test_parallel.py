@@ -0,0 +1,55 @@
+'''
+Tests that the multi-process batch functions return exactly what the in-process ones do.
+'''
+
+import numpy as np
+import pytest
+
+import BSParallel
+from BSModel import BSModel, ImpliedVol, _price
+from BSParallel import run_parallel
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    # small chunks, so a few hundred quotes are split into uneven tasks over both workers
+    monkeypatch.setattr(BSParallel, 'MIN_CHUNK_SIZE', 37)
+    rng = np.random.default_rng(0)
+    n = 1001
+    K = 100.0 * np.exp(rng.uniform(-0.5, 0.5, n))
+    T = rng.uniform(0.05, 3.0, n)
+    sigma = rng.uniform(0.1, 0.8, n)
+    option_type = np.where(rng.random(n) < 0.5, 'Call', 'Put')
+    return 100.0, K, T, 0.03, sigma, option_type
+
+
+def test_price_batch(chain):
+    np.testing.assert_array_equal(BSModel.price_batch(*chain, workers=2), BSModel.price_batch(*chain))
+
+
+def test_greeks(chain):
+    S0, K, T, r, sigma, option_type = chain
+    parallel = BSModel(S0, K, T, r, sigma).greeks(workers=2)
+    serial = BSModel(S0, K, T, r, sigma).greeks()
+    for name, a, b in zip(parallel._fields, parallel, serial):
+        np.testing.assert_array_equal(a, b, err_msg=name)
+
+
+@pytest.mark.parametrize('method, initial_vol', [('newton', None), ('newton', 0.3), ('rational', None)])
+def test_implied_vol_batch(chain, method, initial_vol):
+    S0, K, T, r, sigma, option_type = chain
+    price = BSModel.price_batch(*chain)
+    initial = None if initial_vol is None else np.full(K.size, initial_vol)
+    parallel = ImpliedVol.implied_vol_batch(S0, K, T, r, price, option_type, initial, method=method, workers=2)
+    serial = ImpliedVol.implied_vol_batch(S0, K, T, r, price, option_type, initial, method=method)
+    for name, a, b in zip(parallel._fields, parallel, serial):
+        np.testing.assert_array_equal(a, b, err_msg=name)
+
+
+def test_run_parallel_chunk_size_and_shape(chain):
+    S0, K, T, r, sigma, option_type = chain
+    K, T = K[:1000].reshape(40, 25), T[:1000].reshape(40, 25)
+    is_call = option_type[:1000].reshape(40, 25) == 'Call'
+    price, = run_parallel(_price, (S0, K, T, r, 0.2, is_call), [float], workers=2, chunk_size=99)
+    assert price.shape == (40, 25)
+    np.testing.assert_array_equal(price, _price(S0, K, T, r, 0.2, is_call))
@@ -0,0 +1,64 @@
+'''
+Tests of the opt-in profiling hooks.
+'''
+
+import threading
+
+import numpy as np
+
+import BSProfile
+from BSModel import BSModel, ImpliedVol
+
+
+def calls(prof):
+    # the public BSModel and ImpliedVol methods only: without numba, BSModel's own norm_cdf/norm_pdf calls are
+    # recorded as well
+    return {sample['labels']['function']: sample['value']
+            for sample in prof.to_dict().get('bspricer_calls_total', {}).get('samples', [])
+            if sample['labels']['function'].startswith(('BSModel.', 'ImpliedVol.'))}
+
+
+def test_overlapping_profiles_on_threads_are_isolated():
+    original = vars(BSModel)['price_batch']
+    barrier = threading.Barrier(2)
+    profiles = {}
+
+    def worker(n):
+        with BSProfile.profile() as prof:
+            barrier.wait()      # both profiles are active before either thread prices
+            for _ in range(n):
+                BSModel.price_batch(100.0, np.full(8, 100.0), 1.0, 0.05, 0.2, 'Call')
+            with BSProfile.stage(f'stage{n}'):
+                pass
+            barrier.wait()      # and stay active until both threads are done
+        profiles[n] = prof
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in (2, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n, prof in profiles.items():
+        assert calls(prof) == {'BSModel.price_batch': n}
+        stages = prof.to_dict()['bspricer_stage_seconds']['samples']
+        assert [sample['labels'] for sample in stages] == [{'stage': f'stage{n}'}]
+    assert vars(BSModel)['price_batch'] is original
+    assert BSProfile.current() is None
+
+
+def test_nested_profiles_record_into_the_innermost():
+    with BSProfile.profile() as outer:
+        with BSProfile.profile() as inner:
+            ImpliedVol(100.0, 100.0, 1.0, 0.05, 10.0, 'Call', 0.2).implied_vol()
+        BSModel.price_batch(100.0, 100.0, 1.0, 0.05, 0.2, 'Call')
+    assert 'ImpliedVol.implied_vol' in calls(inner)
+    assert 'BSModel.price_batch' not in calls(inner)
+    assert calls(outer) == {'BSModel.price_batch': 1}
+    assert inner.to_dict()['bspricer_iv_iterations']['samples'][0]['labels'] == {'method': 'scalar_newton'}
+
+
+def test_stage_outside_a_profile_does_nothing():
+    with BSProfile.stage('idle'):
+        pass
+    assert BSProfile.current() is None